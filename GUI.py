@@ -1,19 +1,23 @@
+import time
+STARTUP_T0 = time.perf_counter()  # For --measure-startup
 import customtkinter as ctk
 from tkinter import messagebox
-import csv
 import os
+import sys
 import threading
 from PIL import Image, ImageTk
-import pandas as pd
-import matplotlib.pyplot as plt
 
 # Import backend logic
 from logic import (
-    create_client, validate, generate_report, plot_charts, 
-    predict_future_expense_data, predict_next_month_expense, export_user_data,
-    load_all_clients, save_all_clients, find_client_by_username, Client, ChildAccount,
-    generate_dummy_data_logic # Import the demo data generator
+    create_client, validate, prewarm, generate_report, render_charts,
+    predict_overview, cached_overview, export_user_data,
+    load_all_clients, save_all_clients, find_client_by_username, Client, ChildAccount, ClientRegistry,
+    generate_dummy_data_logic, # Import the demo data generator
+    on_account_change, recurring_scheduler, export_formats, TRANSACTION_TYPES
 )
+from storage import get_store
+import instrument
+from instrument import span
 
 # --- Theme Colors ---
 PRIMARY_DARK = "#1A1A2E"
@@ -35,7 +39,7 @@ app.title("X-Analytics - Master Brain Edition")
 app.configure(fg_color=PRIMARY_DARK)
 
 # Global State
-clients = []
+clients = ClientRegistry()
 current_user = None
 prediction_img_label = None 
 monthly_img_label = None
@@ -49,9 +53,8 @@ def format_currency(amount):
         return "PKR 0.00"
 
 def ensure_transaction_file():
-    if not os.path.exists("transactions.csv"):
-        with open("transactions.csv", "w", newline='') as f:
-            csv.writer(f).writerow(["username", "timestamp", "amount", "type", "category"])
+    # Opens transactions.db and imports a legacy transactions.csv on first run
+    get_store()
 
 def load_initial_users():
     global clients
@@ -82,7 +85,7 @@ def switch_view(name):
         content_frames[name].pack(fill="both", expand=True, padx=20, pady=20)
         func_name = f"update_{name.lower().replace(' ', '_')}_view"
         if hasattr(app, func_name): 
-            getattr(app, func_name)()
+            with span(f"gui.{func_name}"): getattr(app, func_name)()
 
 # --- Sidebar ---
 sidebar = ctk.CTkFrame(app, width=220, fg_color=SECONDARY_DARK, corner_radius=0)
@@ -91,8 +94,9 @@ def create_sidebar():
     for w in sidebar.winfo_children(): w.destroy()
     ctk.CTkLabel(sidebar, text="X-Analytics", font=("Arial", 22, "bold"), text_color=ACCENT_PURPLE).pack(pady=30)
     
-    buttons = ["Dashboard", "Income", "Expense", "Transfer", "Loans", "Budget", "Graphs", "AI Overview", "Export Data"]
-    icons = ["🏠", "➕", "➖", "🔁", "💰", "🎯", "📊", "🤖", "💾"]
+    buttons = ["Dashboard", "History", "Income", "Expense", "Transfer", "Loans", "Budget", "Graphs", "AI Overview", "Export Data"]
+    icons = ["🏠", "📜", "➕", "➖", "🔁", "💰", "🎯", "📊", "🤖", "💾"]
+    if instrument.ENABLED: buttons.append("Diagnostics"); icons.append("⏱")
     
     for btn, icon in zip(buttons, icons):
         ctk.CTkButton(sidebar, text=f"{icon}  {btn}", width=180, height=40, fg_color="transparent", 
@@ -105,7 +109,7 @@ def create_sidebar():
 
 def handle_logout():
     global current_user
-    if current_user: save_all_clients(clients)
+    if current_user: save_all_clients(clients); get_store().flush()
     current_user = None
     sidebar.pack_forget()
     switch_view("Login")
@@ -125,10 +129,13 @@ def login_cmd():
     if idx is not None:
         global current_user
         current_user = clients[idx]
-        current_user.process_recurring()
+        if current_user.process_recurring(): save_all_clients(clients)  # As recurring_tick does, so a restart doesn't charge them again
         l_user.delete(0, 'end'); l_pass.delete(0, 'end')
         sidebar.pack(side="left", fill="y"); create_sidebar()
         switch_view("Dashboard")
+        # Heavy libraries and the model load in the background while the user looks at the dashboard
+        if "--no-prewarm" not in sys.argv: threading.Thread(target=prewarm, args=(current_user.uname,), daemon=True).start()
+        if "--measure-dashboard" in sys.argv: app.after(500, measure_dashboard)
     else: messagebox.showerror("Error", "Invalid Credentials")
 ctk.CTkButton(login_sub_frame, text="Login", command=login_cmd, width=250, height=40, fg_color=ACCENT_PURPLE).pack(pady=20)
 ctk.CTkButton(login_sub_frame, text="Register New Account", fg_color="transparent", command=lambda: switch_view("Register")).pack()
@@ -156,46 +163,98 @@ ctk.CTkButton(register_sub_frame, text="Back to Login", fg_color="transparent",
 dashboard_frame = ctk.CTkFrame(main_content, fg_color=PRIMARY_DARK)
 content_frames["Dashboard"] = dashboard_frame
 
-def update_dashboard_view():
-    for w in dashboard_frame.winfo_children(): w.destroy()
-    ctk.CTkLabel(dashboard_frame, text=f"Hello, {current_user.uname.title()}!", font=("Arial", 32, "bold"), text_color="white").pack(anchor="w", pady=(10,5))
-    
-    cards_frame = ctk.CTkFrame(dashboard_frame, fg_color="transparent")
-    cards_frame.pack(fill="x", pady=20)
-    
-    bal_card = ctk.CTkFrame(cards_frame, fg_color=SECONDARY_DARK, corner_radius=15)
-    bal_card.pack(side="left", fill="both", expand=True, padx=(0,10))
-    ctk.CTkLabel(bal_card, text="Current Balance", font=("Arial", 14), text_color="gray").pack(pady=(15,5))
-    ctk.CTkLabel(bal_card, text=format_currency(current_user.amount), font=("Arial", 28, "bold"), text_color=ACCENT_GREEN).pack(pady=(0,15))
-    
-    bud_card = ctk.CTkFrame(cards_frame, fg_color=SECONDARY_DARK, corner_radius=15)
-    bud_card.pack(side="left", fill="both", expand=True, padx=(10,0))
-    ctk.CTkLabel(bud_card, text="Monthly Budget", font=("Arial", 14), text_color="gray").pack(pady=(15,5))
-    spent = current_user.total_spent; budget = current_user.budget
-    prog = min(spent/budget, 1.0) if budget > 0 else 0
-    rem = budget - spent if budget > 0 else 0
-    rem_text = format_currency(rem) if budget > 0 else "No Budget"
-    
-    ctk.CTkLabel(bud_card, text=f"{rem_text} Remaining", font=("Arial", 20, "bold"), text_color=ACCENT_BLUE).pack(pady=(0,5))
-    pb = ctk.CTkProgressBar(bud_card, progress_color=ACCENT_BLUE); pb.pack(pady=10, padx=20, fill="x"); pb.set(prog)
-    ctk.CTkLabel(bud_card, text=f"{int(prog*100)}% Used", font=("Arial", 12)).pack(pady=(0,10))
+RECENT_ROWS = 6
+
+class DashboardView:
+    """
+    View-model for the dashboard: widgets are built once, and refresh() only
+    pushes the current account's numbers into them. Account operations call
+    on_account_change listeners, which schedule a refresh for the logged-in user
+    while the dashboard is on screen.
+    """
+    def __init__(self, frame):
+        self.frame = frame; self.pending = False
+        self.greeting = ctk.CTkLabel(frame, text="", font=("Arial", 32, "bold"), text_color="white"); self.greeting.pack(anchor="w", pady=(10,5))
+        
+        cards_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        cards_frame.pack(fill="x", pady=20)
+        
+        bal_card = ctk.CTkFrame(cards_frame, fg_color=SECONDARY_DARK, corner_radius=15)
+        bal_card.pack(side="left", fill="both", expand=True, padx=(0,10))
+        ctk.CTkLabel(bal_card, text="Current Balance", font=("Arial", 14), text_color="gray").pack(pady=(15,5))
+        self.balance = ctk.CTkLabel(bal_card, text="", font=("Arial", 28, "bold"), text_color=ACCENT_GREEN); self.balance.pack(pady=(0,15))
+        
+        bud_card = ctk.CTkFrame(cards_frame, fg_color=SECONDARY_DARK, corner_radius=15)
+        bud_card.pack(side="left", fill="both", expand=True, padx=(10,0))
+        ctk.CTkLabel(bud_card, text="Monthly Budget", font=("Arial", 14), text_color="gray").pack(pady=(15,5))
+        self.remaining = ctk.CTkLabel(bud_card, text="", font=("Arial", 20, "bold"), text_color=ACCENT_BLUE); self.remaining.pack(pady=(0,5))
+        self.progress = ctk.CTkProgressBar(bud_card, progress_color=ACCENT_BLUE); self.progress.pack(pady=10, padx=20, fill="x")
+        self.used = ctk.CTkLabel(bud_card, text="", font=("Arial", 12)); self.used.pack(pady=(0,10))
+
+        ctk.CTkLabel(frame, text="Recent Transactions", font=("Arial", 20, "bold")).pack(anchor="w", pady=(20,10))
+        trans_frame = ctk.CTkFrame(frame, fg_color=SECONDARY_DARK)
+        trans_frame.pack(fill="both", expand=True)
+        self.empty = ctk.CTkLabel(trans_frame, text="")
+        self.recent = []
+        for _ in range(RECENT_ROWS):
+            row_f = ctk.CTkFrame(trans_frame, fg_color="transparent", height=40)
+            row_f.pack(fill="x", padx=10, pady=5)
+            cells = [ctk.CTkLabel(row_f, text="", width=100, anchor="w"),
+                     ctk.CTkLabel(row_f, text="", width=150, anchor="w", font=("Arial", 14, "bold")),
+                     ctk.CTkLabel(row_f, text="", width=120, anchor="e", font=("Arial", 14, "bold"))]
+            cells[0].pack(side="left"); cells[1].pack(side="left"); cells[2].pack(side="right")
+            self.recent.append(cells)
+
+    def refresh(self):
+        self.pending = False
+        if not current_user: return
+        self.greeting.configure(text=f"Hello, {current_user.uname.title()}!")
+        self.balance.configure(text=format_currency(current_user.amount))
+        spent = current_user.total_spent; budget = current_user.budget
+        prog = min(spent/budget, 1.0) if budget > 0 else 0
+        rem = budget - spent if budget > 0 else 0
+        rem_text = format_currency(rem) if budget > 0 else "No Budget"
+        self.remaining.configure(text=f"{rem_text} Remaining"); self.progress.set(prog); self.used.configure(text=f"{int(prog*100)}% Used")
+        try:
+            recent = get_store().rows(current_user.uname, limit=RECENT_ROWS, newest_first=True)
+            self.empty.configure(text="No recent transactions.")
+        except: recent = []; self.empty.configure(text="Could not load data.")
+        for i, cells in enumerate(self.recent):
+            if i < len(recent):
+                row = recent[i]; clr = ACCENT_GREEN if row['type'] in ["Income", "Loan Received"] else ACCENT_RED
+                cells[0].configure(text=str(row['timestamp'])[:10]); cells[1].configure(text=row['category'])
+                cells[2].configure(text=format_currency(row['amount']), text_color=clr)
+            else:
+                for c in cells: c.configure(text="")
+        if recent: self.empty.pack_forget()
+        else: self.empty.pack(pady=20)
+
+    def schedule(self, client):
+        # A hidden dashboard is left alone (no ledger read, so group commit can batch); switch_view refreshes it on show
+        if client is current_user and not self.pending and self.frame.winfo_ismapped():
+            self.pending = True; app.after_idle(self.refresh)
+
+dashboard_view = None
 
-    ctk.CTkLabel(dashboard_frame, text="Recent Transactions", font=("Arial", 20, "bold")).pack(anchor="w", pady=(20,10))
-    trans_frame = ctk.CTkFrame(dashboard_frame, fg_color=SECONDARY_DARK)
-    trans_frame.pack(fill="both", expand=True)
-    try:
-        df = pd.read_csv("transactions.csv")
-        user_df = df[df['username'] == current_user.uname.lower()].tail(6).iloc[::-1]
-        if not user_df.empty:
-            for _, row in user_df.iterrows():
-                row_f = ctk.CTkFrame(trans_frame, fg_color="transparent", height=40)
-                row_f.pack(fill="x", padx=10, pady=5)
-                clr = ACCENT_GREEN if row['type'] in ["Income", "Loan Received"] else ACCENT_RED
-                ctk.CTkLabel(row_f, text=str(row['timestamp'])[:10], width=100, anchor="w").pack(side="left")
-                ctk.CTkLabel(row_f, text=row['category'], width=150, anchor="w", font=("Arial", 14, "bold")).pack(side="left")
-                ctk.CTkLabel(row_f, text=format_currency(row['amount']), width=120, anchor="e", text_color=clr, font=("Arial", 14, "bold")).pack(side="right")
-        else: ctk.CTkLabel(trans_frame, text="No recent transactions.").pack(pady=20)
-    except: ctk.CTkLabel(trans_frame, text="Could not load data.").pack(pady=20)
+def update_dashboard_view():
+    global dashboard_view
+    if dashboard_view is None: dashboard_view = DashboardView(dashboard_frame)
+    dashboard_view.refresh()
+on_account_change(lambda c: dashboard_view.schedule(c) if dashboard_view else None)
+
+def measure_dashboard(runs=20):
+    """Prints the cost of a full destroy-and-rebuild of the dashboard vs an in-place refresh."""
+    global dashboard_view
+    update_dashboard_view(); app.update()
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        for w in dashboard_frame.winfo_children(): w.destroy()
+        dashboard_view = DashboardView(dashboard_frame); dashboard_view.refresh(); app.update()
+    rebuild = (time.perf_counter() - t0) / runs
+    t0 = time.perf_counter()
+    for _ in range(runs): dashboard_view.refresh(); app.update()
+    refresh = (time.perf_counter() - t0) / runs
+    print(f"Dashboard: rebuild {rebuild*1000:.1f} ms, in-place refresh {refresh*1000:.1f} ms ({runs} runs)")
 app.update_dashboard_view = update_dashboard_view
 
 
@@ -343,26 +402,36 @@ app.update_budget_view = update_budget_view
 # --- VIEW 7: GRAPHS ---
 graphs_frame = ctk.CTkFrame(main_content, fg_color=PRIMARY_DARK)
 content_frames["Graphs"] = graphs_frame
+CHART_WIDTHS = {"monthly": 700, "pie": 500}
+graphs_request = 0
+
 def update_graphs_view():
-    global monthly_img_label, pie_img_label
+    global graphs_request
     for w in graphs_frame.winfo_children(): w.destroy()
     ctk.CTkLabel(graphs_frame, text="Analytics", font=("Arial", 28, "bold")).pack(anchor="w", pady=20)
-    plot_charts(current_user.uname)
     scroll = ctk.CTkScrollableFrame(graphs_frame, fg_color="transparent"); scroll.pack(fill="both", expand=True)
-    m_path = f"{current_user.uname.lower()}_monthly_trend.png"
-    if os.path.exists(m_path):
-        ctk.CTkLabel(scroll, text="Net Flow", font=("Arial", 16, "bold")).pack(pady=10)
-        try:
-            img = Image.open(m_path); r = min(700/img.width, 1.0); img = img.resize((int(img.width*r), int(img.height*r)), Image.Resampling.BICUBIC)
-            i = ImageTk.PhotoImage(img); monthly_img_label = ctk.CTkLabel(scroll, text="", image=i); monthly_img_label.image=i; monthly_img_label.pack(pady=10)
-        except: pass
-    p_path = f"{current_user.uname.lower()}_expense_pie.png"
-    if os.path.exists(p_path):
-        ctk.CTkLabel(scroll, text="Breakdown", font=("Arial", 16, "bold")).pack(pady=20)
-        try:
-            img = Image.open(p_path); r = min(500/img.width, 1.0); img = img.resize((int(img.width*r), int(img.height*r)), Image.Resampling.BICUBIC)
-            i = ImageTk.PhotoImage(img); pie_img_label = ctk.CTkLabel(scroll, text="", image=i); pie_img_label.image=i; pie_img_label.pack(pady=10)
-        except: pass
+    spin = ctk.CTkProgressBar(scroll, mode="indeterminate", progress_color=ACCENT_BLUE); spin.pack(pady=30); spin.start()
+    graphs_request += 1; request = graphs_request; uname = current_user.uname
+
+    def run_charts():
+        try: images = render_charts(uname, CHART_WIDTHS)
+        except Exception: images = {}
+        app.after(0, lambda: show(images))
+
+    def show(images):
+        global monthly_img_label, pie_img_label
+        if request != graphs_request or not scroll.winfo_exists(): return  # View was rebuilt meanwhile
+        spin.stop(); spin.destroy()
+        if "monthly" in images:
+            ctk.CTkLabel(scroll, text="Net Flow", font=("Arial", 16, "bold")).pack(pady=10)
+            with span("gui.photo_image"): i = ImageTk.PhotoImage(Image.fromarray(images["monthly"]))
+            monthly_img_label = ctk.CTkLabel(scroll, text="", image=i); monthly_img_label.image=i; monthly_img_label.pack(pady=10)
+        if "pie" in images:
+            ctk.CTkLabel(scroll, text="Breakdown", font=("Arial", 16, "bold")).pack(pady=20)
+            with span("gui.photo_image"): i = ImageTk.PhotoImage(Image.fromarray(images["pie"]))
+            pie_img_label = ctk.CTkLabel(scroll, text="", image=i); pie_img_label.image=i; pie_img_label.pack(pady=10)
+        if not images: ctk.CTkLabel(scroll, text="Could not load data.").pack(pady=20)
+    threading.Thread(target=run_charts, daemon=True).start()
 app.update_graphs_view = update_graphs_view
 
 
@@ -381,8 +450,7 @@ def update_ai_overview_view():
 
     def run_ai():
         try:
-            txt = predict_next_month_expense(current_user.uname)
-            grp = predict_future_expense_data(current_user.uname)
+            txt, grp = predict_overview(current_user.uname)
             app.after(0, lambda: show(txt, grp))
         except Exception as e: app.after(0, lambda: err(str(e)))
 
@@ -405,13 +473,16 @@ def update_ai_overview_view():
         ctk.CTkLabel(content, text=txt, font=("Arial", 20), text_color="white").pack(anchor="w", pady=(0, 20))
         if grp.get("plot_path") and os.path.exists(grp["plot_path"]):
             try:
-                img = Image.open(grp["plot_path"]); r = min(800/img.width, 1.0); img = img.resize((int(img.width*r), int(img.height*r)), Image.Resampling.BICUBIC)
-                i = ImageTk.PhotoImage(img); prediction_img_label = ctk.CTkLabel(content, text="", image=i); prediction_img_label.image=i; prediction_img_label.pack(pady=10)
+                with span("gui.image_resize"): img = Image.open(grp["plot_path"]); r = min(800/img.width, 1.0); img = img.resize((int(img.width*r), int(img.height*r)), Image.Resampling.BICUBIC)
+                with span("gui.photo_image"): i = ImageTk.PhotoImage(img)
+                prediction_img_label = ctk.CTkLabel(content, text="", image=i); prediction_img_label.image=i; prediction_img_label.pack(pady=10)
             except: pass
         else: ctk.CTkLabel(content, text=grp.get("message", "Error"), text_color=ACCENT_RED).pack()
 
     def err(e): spin.stop(); load.destroy(); ctk.CTkLabel(content, text=f"System Error: {e}", text_color=ACCENT_RED).pack()
-    threading.Thread(target=run_ai, daemon=True).start()
+    cached = cached_overview(current_user.uname)
+    if cached: show(*cached)  # Neither the history nor the model changed since the last forecast
+    else: threading.Thread(target=run_ai, daemon=True).start()
 app.update_ai_overview_view = update_ai_overview_view
 
 
@@ -421,15 +492,145 @@ content_frames["Export Data"] = export_frame
 def update_export_data_view():
     for w in export_frame.winfo_children(): w.destroy()
     ctk.CTkLabel(export_frame, text="Data Export", font=("Arial", 28, "bold")).pack(anchor="w", pady=20)
+    opts = ctk.CTkFrame(export_frame, fg_color=SECONDARY_DARK, corner_radius=10); opts.pack(fill="x", pady=(0, 20), ipady=10)
+    fmt = ctk.CTkOptionMenu(opts, values=[f.upper() for f in export_formats()]); fmt.pack(side="left", padx=(20, 10))
+    typ = ctk.CTkOptionMenu(opts, values=["All Types"] + TRANSACTION_TYPES); typ.pack(side="left", padx=10)
+    e_start = ctk.CTkEntry(opts, width=130, placeholder_text="From YYYY-MM-DD"); e_start.pack(side="left", padx=10)
+    e_end = ctk.CTkEntry(opts, width=130, placeholder_text="To YYYY-MM-DD"); e_end.pack(side="left", padx=10)
+    bar = ctk.CTkProgressBar(export_frame, progress_color=ACCENT_BLUE); bar.set(0)
+    status = ctk.CTkLabel(export_frame, text="", text_color="gray")
+
     def do_exp():
-        msg = export_user_data(current_user.uname)
-        messagebox.showinfo("Export", msg) if "✅" in msg else messagebox.showerror("Error", msg)
-    ctk.CTkButton(export_frame, text="Download CSV", command=do_exp, height=50, width=200, fg_color=ACCENT_BLUE).pack(anchor="w")
+        try:
+            start = e_start.get().strip() or None; end = e_end.get().strip() or None
+            for d in (start, end):
+                if d: time.strptime(d, "%Y-%m-%d")
+        except ValueError: return messagebox.showerror("Error", "Dates must be YYYY-MM-DD")
+        types = None if typ.get() == "All Types" else [typ.get()]
+        btn.configure(state="disabled"); bar.pack(anchor="w", fill="x", pady=(20, 5)); status.pack(anchor="w"); bar.set(0)
+        uname = current_user.uname
+
+        def progress(done, total):
+            app.after(0, lambda: (bar.set(done / total if total else 1), status.configure(text=f"{done:,} / {total:,} rows")))
+        def run():
+            msg = export_user_data(uname, fmt=fmt.get().lower(), start=start, end=end, types=types, progress=progress)
+            app.after(0, lambda: finish(msg))
+        def finish(msg):
+            if not btn.winfo_exists(): return
+            btn.configure(state="normal")
+            messagebox.showinfo("Export", msg) if "Exported" in msg else messagebox.showerror("Error", msg)
+        threading.Thread(target=run, daemon=True).start()
+    btn = ctk.CTkButton(export_frame, text="Download", command=do_exp, height=50, width=200, fg_color=ACCENT_BLUE); btn.pack(anchor="w")
 app.update_export_data_view = update_export_data_view
 
 
+# --- VIEW 10: HISTORY ---
+history_frame = ctk.CTkFrame(main_content, fg_color=PRIMARY_DARK)
+content_frames["History"] = history_frame
+HISTORY_ROWS = 14  # Widget rows in the pool; only this many transactions are ever fetched at once
+history = {"rows": [], "offset": 0, "total": 0, "widgets": [], "pos": None, "bar": None}
+
+def build_history_view():
+    ctk.CTkLabel(history_frame, text="Transaction History", font=("Arial", 28, "bold")).pack(anchor="w", pady=20)
+    history["pos"] = ctk.CTkLabel(history_frame, text="", text_color="gray"); history["pos"].pack(anchor="w")
+    body = ctk.CTkFrame(history_frame, fg_color=SECONDARY_DARK); body.pack(fill="both", expand=True, pady=10)
+    history["bar"] = ctk.CTkScrollbar(body, command=history_scrollbar); history["bar"].pack(side="right", fill="y")
+    rows_f = ctk.CTkFrame(body, fg_color="transparent"); rows_f.pack(side="left", fill="both", expand=True)
+    for _ in range(HISTORY_ROWS):
+        row_f = ctk.CTkFrame(rows_f, fg_color="transparent", height=36)
+        row_f.pack(fill="x", padx=10, pady=2)
+        cells = [ctk.CTkLabel(row_f, text="", width=170, anchor="w"),
+                 ctk.CTkLabel(row_f, text="", width=130, anchor="w"),
+                 ctk.CTkLabel(row_f, text="", width=150, anchor="w", font=("Arial", 14, "bold")),
+                 ctk.CTkLabel(row_f, text="", width=120, anchor="e", font=("Arial", 14, "bold"))]
+        for c in cells[:3]: c.pack(side="left")
+        cells[3].pack(side="right")
+        history["widgets"].append(cells)
+    for w in [body, rows_f] + [c for cells in history["widgets"] for c in cells]:
+        w.bind("<MouseWheel>", lambda e: history_scroll(-1 if e.delta > 0 else 1) if e.delta else None)
+        w.bind("<Button-4>", lambda e: history_scroll(-1)); w.bind("<Button-5>", lambda e: history_scroll(1))
+
+def render_history():
+    """Reuses the pooled row widgets: only their text and colour change."""
+    rows = history["rows"]
+    for i, cells in enumerate(history["widgets"]):
+        if i < len(rows):
+            r = rows[i]; clr = ACCENT_GREEN if r['type'] in ["Income", "Loan Received", "Transfer In"] else ACCENT_RED
+            cells[0].configure(text=str(r['timestamp'])[:19]); cells[1].configure(text=r['type'])
+            cells[2].configure(text=r['category']); cells[3].configure(text=format_currency(r['amount']), text_color=clr)
+        else:
+            for c in cells: c.configure(text="")
+    total = history["total"]; off = history["offset"]
+    history["pos"].configure(text=f"{off + 1 if rows else 0}-{off + len(rows)} of {total:,}")
+    history["bar"].set(off / total if total else 0, (off + len(rows)) / total if total else 1)
+
+def history_jump(offset):
+    """Random access (scrollbar drag): one LIMIT/OFFSET query over the user's index."""
+    history["offset"] = max(0, min(int(offset), history["total"] - HISTORY_ROWS))
+    history["rows"] = get_store().rows(current_user.uname, limit=HISTORY_ROWS, offset=history["offset"], newest_first=True)
+    render_history()
+
+def history_scroll(delta):
+    """Small steps page from the edge row's (timestamp, id) cursor and shift the visible window."""
+    rows = history["rows"]
+    if not rows or not delta: return
+    if delta > 0:
+        edge = rows[-1]; new = get_store().page(current_user.uname, before=(edge['timestamp'], edge['id']), limit=delta)
+        if not new: return
+        history["rows"] = (rows + new)[len(new):]; history["offset"] += len(new)
+    else:
+        edge = rows[0]; new = get_store().page(current_user.uname, after=(edge['timestamp'], edge['id']), limit=-delta)
+        if not new: return
+        history["rows"] = (new + rows)[:HISTORY_ROWS]; history["offset"] -= len(new)
+    render_history()
+
+def history_scrollbar(*args):
+    if args[0] == "moveto": history_jump(float(args[1]) * history["total"])
+    elif args[0] == "scroll": history_scroll(int(args[1]) * (HISTORY_ROWS if args[2] == "pages" else 1))
+
+def update_history_view():
+    if not history["widgets"]: build_history_view()
+    history["total"] = get_store().count(current_user.uname)
+    history_jump(0)
+app.update_history_view = update_history_view
+
+
+# --- VIEW 11: DIAGNOSTICS (only with --profile / FINANCE_PROFILE=1) ---
+diagnostics_frame = ctk.CTkFrame(main_content, fg_color=PRIMARY_DARK)
+content_frames["Diagnostics"] = diagnostics_frame
+
+def update_diagnostics_view():
+    for w in diagnostics_frame.winfo_children(): w.destroy()
+    ctk.CTkLabel(diagnostics_frame, text="⏱ Diagnostics", font=("Arial", 28, "bold")).pack(anchor="w", pady=20)
+    box = ctk.CTkTextbox(diagnostics_frame, font=("Courier New", 13), fg_color=SECONDARY_DARK); box.pack(fill="both", expand=True)
+    box.insert("end", instrument.report()); box.configure(state="disabled")
+    row = ctk.CTkFrame(diagnostics_frame, fg_color="transparent"); row.pack(anchor="w", pady=10)
+    ctk.CTkButton(row, text="Refresh", command=update_diagnostics_view, fg_color=ACCENT_PURPLE).pack(side="left", padx=(0, 10))
+    ctk.CTkButton(row, text="Save JSON", command=lambda: messagebox.showinfo("Diagnostics", f"Saved to {instrument.dump()}"), fg_color=ACCENT_BLUE).pack(side="left", padx=(0, 10))
+    ctk.CTkButton(row, text="Reset", command=lambda: (instrument.reset(), update_diagnostics_view()), fg_color=ACCENT_RED).pack(side="left")
+app.update_diagnostics_view = update_diagnostics_view
+
+
+def recurring_tick():
+    # Charges whatever fell due while the app was open, then checks again in a minute
+    if recurring_scheduler.run_due(): save_all_clients(clients)
+    app.after(60000, recurring_tick)
+
+
+def measure_startup():
+    # python GUI.py --measure-startup: time until the login screen is drawn, then exit
+    app.update()
+    ms = (time.perf_counter() - STARTUP_T0) * 1000; instrument.record("startup.login_screen", ms)
+    heavy = [m for m in ("pandas", "matplotlib", "sklearn", "tensorflow") if m in sys.modules]
+    print(f"Login screen ready in {ms:.0f} ms (heavy modules loaded: {', '.join(heavy) or 'none'})")
+    app.destroy()
+
+
 # --- STARTUP ---
 ensure_transaction_file()
 load_initial_users()
+recurring_scheduler.load(clients)
+recurring_tick()  # Catches up on payments missed while the app was closed
 switch_view("Login")
+if "--measure-startup" in sys.argv: app.after(0, measure_startup)
 app.mainloop()
@@ -0,0 +1,104 @@
+import argparse
+import csv
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from forecast import get_engine, model_available
+from logic import MODEL_FILE, LOOK_BACK, FORECAST_DAYS, EXPENSE_TYPES, load_all_clients, parse_timestamps
+from snapshot import refresh_snapshot
+from storage import get_store
+
+
+OUTPUT_FILE = "batch_forecast.csv"
+BATCH_SIZE = 1024  # Users rolled forward per model call
+
+
+def build_user_windows(usernames=None):
+    """
+    One pass over the ledger for every user's expense history.
+    1. Sums expenses per (user, day) straight from the mapped snapshot, then
+       streams only the rows added after it, chunk by chunk.
+    2. Computes each user's MinMax range the same way get_user_sequence does
+       (days without spending count as 0).
+    3. Returns the last LOOK_BACK days, scaled, as one (N, LOOK_BACK, 1) array.
+    """
+    parts = []
+    snap = refresh_snapshot(get_store().path)
+    if snap is not None:
+        df = snap.daily_frame(EXPENSE_TYPES)
+        if usernames is not None: df = df[df['username'].isin(usernames)]
+        parts.append(df.set_index(['username', 'day'])['amount'])
+    for chunk in get_store().scan(types=EXPENSE_TYPES, after_id=snap.max_id if snap is not None else 0):
+        df = pd.DataFrame(chunk, columns=["username", "timestamp", "amount", "type", "category"])
+        if usernames is not None: df = df[df['username'].isin(usernames)]
+        df['timestamp'] = parse_timestamps(df['timestamp'])
+        df = df.dropna(subset=['timestamp'])
+        parts.append(df.groupby(['username', df['timestamp'].dt.floor('D')])['amount'].sum())
+    if not parts: return [], np.empty((0, LOOK_BACK, 1), dtype=np.float32), np.empty(0), np.empty(0), []
+
+    daily = pd.concat(parts).groupby(level=[0, 1]).sum().reset_index()
+    daily.columns = ['username', 'day', 'amount']
+    stats = daily.groupby('username').agg(first=('day', 'min'), last=('day', 'max'), n=('day', 'size'), lo=('amount', 'min'), hi=('amount', 'max'))
+    span = (stats['last'] - stats['first']).dt.days + 1
+    gaps = stats['n'] < span
+    stats['lo'] = np.where(gaps, np.minimum(stats['lo'], 0), stats['lo'])
+    stats['hi'] = np.where(gaps, np.maximum(stats['hi'], 0), stats['hi'])
+    stats = stats[span >= LOOK_BACK]
+
+    names = list(stats.index)
+    row_of = pd.Series(np.arange(len(names)), index=stats.index)
+    recent = daily[daily['username'].isin(stats.index)]
+    offset = (recent['username'].map(stats['last']) - recent['day']).dt.days.to_numpy()
+    keep = offset < LOOK_BACK
+    windows = np.zeros((len(names), LOOK_BACK), dtype=np.float64)
+    windows[row_of[recent['username']].to_numpy()[keep], LOOK_BACK - 1 - offset[keep]] = recent['amount'].to_numpy()[keep]
+
+    lo = stats['lo'].to_numpy(dtype=np.float64)
+    rng = stats['hi'].to_numpy(dtype=np.float64) - lo
+    rng[rng == 0] = 1.0  # MinMaxScaler leaves constant series unscaled
+    scaled = ((windows - lo[:, None]) / rng[:, None]).astype(np.float32)
+    return names, scaled.reshape(-1, LOOK_BACK, 1), lo, rng, list(stats['last'])
+
+
+def forecast_all_users(out_path=OUTPUT_FILE, usernames=None, batch_size=BATCH_SIZE):
+    """Forecasts the next FORECAST_DAYS of spending for every account and writes one CSV."""
+    if not model_available(MODEL_FILE): return " Model not trained! Run train_model.py first."
+    t0 = time.perf_counter()
+    if usernames is None: usernames = [c.uname for c in load_all_clients()]
+    usernames = [u.lower() for u in usernames]
+    names, X, lo, rng, last_days = build_user_windows(set(usernames))
+    t_windows = time.perf_counter() - t0
+
+    engine = get_engine(MODEL_FILE)
+    totals = np.empty(len(names))
+    for i in range(0, len(names), batch_size):
+        preds = engine.rollout(X[i:i + batch_size], FORECAST_DAYS)
+        money = preds * rng[i:i + batch_size, None] + lo[i:i + batch_size, None]
+        totals[i:i + batch_size] = money.sum(axis=1)
+    t_total = time.perf_counter() - t0
+
+    result = {n: (t, d) for n, t, d in zip(names, totals, last_days)}
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    temp = out_path + ".tmp"
+    with open(temp, "w", newline='') as f:
+        w = csv.writer(f); w.writerow(["username", "status", "last_data_day", f"forecast_{FORECAST_DAYS}d", "generated_at"])
+        for u in usernames:
+            if u in result:
+                total, day = result[u]
+                w.writerow([u, "ok", day.strftime('%Y-%m-%d'), round(max(0.0, float(total)), 2), generated])
+            else: w.writerow([u, "Need 30 days data", "", "", generated])
+    os.replace(temp, out_path)
+    return f" Forecasted {len(names)}/{len(usernames)} users in {t_total:.2f}s (windows {t_windows:.2f}s) -> {out_path}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast next month's expenses for every account in users.txt.")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE)
+    parser.add_argument("-u", "--user", action="append", help="Only forecast these users (repeatable).")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    print(forecast_all_users(args.output, args.user, args.batch_size))
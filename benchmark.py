@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+import logic
+import storage
+import synthetic
+
+
+SCALES = {  # users, days of history per user
+    "small": (10, 180),
+    "medium": (200, 365),
+    "large": (2000, 365),
+}
+RUNS = 5
+TOLERANCE = 0.25  # Allowed slowdown vs baseline before a result counts as a regression
+
+
+def generate_workload(n_users, days, seed=0):
+    """Seeded synthetic.py workload: n_users accounts with `days` of mixed transactions each."""
+    names = synthetic.usernames(n_users)
+    synthetic.write_store(synthetic.generate(n_users, days, seed, names=names))
+    return synthetic.create_accounts(names, "pw", 1e9)
+
+def timeit(fn, runs=RUNS, setup=None, ops=1):
+    times = []
+    for _ in range(runs):
+        if setup: setup()
+        t0 = time.perf_counter(); fn(); times.append(time.perf_counter() - t0)
+    r = {"median_s": statistics.median(times), "min_s": min(times), "runs": runs}
+    if ops > 1: r["ops_per_s"] = ops / r["median_s"]
+    return r
+
+def isolate(tmp):
+    """Points logic's module-level state at tmp (absolute paths, empty caches). Returns a function that restores it."""
+    saved = logic.account_journal, logic.forecast_cache
+    logic.account_journal = storage.AccountJournal(os.path.join(tmp, "users.txt"), logic.USER_HEADER)
+    logic.forecast_cache = logic.ForecastCache(path=os.path.join(tmp, logic.FORECAST_CACHE_FILE))
+    logic._chart_cache.clear(); logic.series_cache.invalidate()
+    def restore():
+        if logic.account_journal.worker: logic.account_journal.worker.join()  # A merge must not outlive the temp dir
+        logic.account_journal, logic.forecast_cache = saved
+        logic._chart_cache.clear(); logic.series_cache.invalidate()
+    return restore
+
+def run_scale(name, n_users, days, model_path=None, runs=RUNS):
+    """Builds a fresh workload in a temp dir and times the hot paths against it."""
+    cwd = os.getcwd(); tmp = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    os.chdir(tmp); restore = isolate(tmp)
+    try:
+        storage.close_store()
+        if model_path: shutil.copy(model_path, logic.MODEL_FILE)
+        t0 = time.perf_counter(); clients = generate_workload(n_users, days)
+        results = {"generate_s": time.perf_counter() - t0, "rows": storage.get_store().count()}
+        user = clients[0].uname
+
+        results["load_all_clients"] = timeit(logic.load_all_clients, runs)
+        clients = logic.load_all_clients()
+        results["save_all_clients_full"] = timeit(lambda: logic.save_all_clients(clients), runs, setup=lambda: [c.mark_dirty() for c in clients])
+        results["save_all_clients_one"] = timeit(lambda: logic.save_all_clients(clients), runs, setup=lambda: clients[0].mark_dirty())
+
+        a, b = clients[0], clients[1 % len(clients)]
+        n = 1000
+        results["withdraw"] = timeit(lambda: [a.withdraw(1, "Bench") for _ in range(n)] and storage.get_store().flush(), runs, ops=n)
+        results["transfer"] = timeit(lambda: [a.transfer(b, 1) for _ in range(n)] and storage.get_store().flush(), runs, ops=n)
+
+        logic.get_user_sequence(user)  # Untimed: the first call also pays the one-time pandas/sklearn import
+        results["get_user_sequence_cold"] = timeit(lambda: logic.get_user_sequence(user), runs, setup=logic.series_cache.invalidate)
+        results["get_user_sequence_warm"] = timeit(lambda: logic.get_user_sequence(user), runs)
+        results["plot_charts"] = timeit(lambda: logic.plot_charts(user), runs)
+        if os.path.exists(logic.MODEL_FILE):
+            logic.predict_next_month_expense(user)  # model load + tracing, reported separately
+            results["predict_next_month_expense"] = timeit(lambda: logic.predict_next_month_expense(user), runs, setup=logic.forecast_cache.clear)
+            results["predict_next_month_expense_cached"] = timeit(lambda: logic.predict_next_month_expense(user), runs)
+        return results
+    finally:
+        storage.close_store(); restore(); os.chdir(cwd); shutil.rmtree(tmp, ignore_errors=True)
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Lists (scale, benchmark, baseline, current, ratio) for every median slower than baseline by more than tolerance."""
+    regressions = []
+    for scale, benches in results["scales"].items():
+        for bench, r in benches.items():
+            base = baseline.get("scales", {}).get(scale, {}).get(bench)
+            if isinstance(r, dict) and isinstance(base, dict) and base.get("median_s"):
+                ratio = r["median_s"] / base["median_s"]
+                if ratio > 1 + tolerance: regressions.append((scale, bench, base["median_s"], r["median_s"], ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ledger, analytics and forecast hot paths.")
+    parser.add_argument("--scales", default="small,medium", help=f"Comma-separated subset of {', '.join(SCALES)}")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    model = os.path.abspath(logic.MODEL_FILE) if os.path.exists(logic.MODEL_FILE) else None
+    if not model: print(" No finance_brain.keras found, skipping the forecast benchmark.")
+    results = {"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                        "machine": platform.machine(), "runs": args.runs}, "scales": {}}
+    for name in args.scales.split(","):
+        print(f"Running '{name}' ({SCALES[name][0]} users x {SCALES[name][1]} days)...")
+        results["scales"][name] = run_scale(name, *SCALES[name], model_path=model, runs=args.runs)
+        for bench, r in results["scales"][name].items():
+            if isinstance(r, dict): print(f"  {bench:<30}{r['median_s'] * 1000:>10.2f} ms" + (f"  ({r['ops_per_s']:,.0f} ops/s)" if "ops_per_s" in r else ""))
+    with open(args.output, "w") as f: json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f: regressions = compare(results, json.load(f), args.tolerance)
+        for scale, bench, base, cur, ratio in regressions:
+            print(f" REGRESSION {scale}/{bench}: {base * 1000:.2f} ms -> {cur * 1000:.2f} ms ({ratio:.2f}x)")
+        if regressions: raise SystemExit(1)
+        print(" No regressions against baseline.")
@@ -0,0 +1,215 @@
+import argparse
+import hashlib
+import importlib.util
+import os
+import threading
+import time
+
+import numpy as np
+
+from instrument import span, timed
+
+
+LOOK_BACK = 30
+# "auto" runs the Keras model when TensorFlow is installed and the exported .npz weights otherwise
+ENGINE = os.environ.get("FINANCE_ENGINE", "auto")
+PARITY_TOLERANCE = 1e-4  # Max abs difference between engines on scaled (0-1) predictions
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of Keras models.
+    1. Loads each model file lazily on first use.
+    2. Hands the same instance to every caller and thread.
+    3. Reloads only when the file's mtime changes (e.g. after re-running train_model.py).
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # path -> (model, mtime)
+        self.hits = 0; self.misses = 0; self.loads = 0
+        self.total_load_time = 0.0; self.last_load_time = 0.0
+
+    def get(self, path):
+        mtime = os.path.getmtime(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[1] == mtime:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            t0 = time.perf_counter()
+            from tensorflow.keras.models import load_model  # TensorFlow is only imported on first use
+            with span("forecast.load_model"): model = load_model(path, compile=False)  # inference only, skip optimizer setup
+            self.last_load_time = time.perf_counter() - t0
+            self.total_load_time += self.last_load_time; self.loads += 1
+            self.entries[path] = (model, mtime)
+            return model
+
+    def clear(self):
+        with self.lock: self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "loads": self.loads,
+                    "last_load_time": self.last_load_time, "total_load_time": self.total_load_time,
+                    "cached": sorted(self.entries)}
+
+
+registry = ModelRegistry()
+
+def get_model(path):
+    return registry.get(path)
+
+def model_cache_stats():
+    return registry.stats()
+
+
+class ForecastEngine:
+    """
+    Autoregressive rollout for one model.
+    Each step is a direct, tf.function-compiled model call instead of
+    model.predict, and the window slides over a buffer allocated once per
+    rollout instead of being rebuilt with np.append.
+    """
+    def __init__(self, model, look_back=LOOK_BACK):
+        import tensorflow as tf
+        self.model = model; self.look_back = look_back
+        self._step = tf.function(lambda x: model(x, training=False), reduce_retracing=True)
+
+    @timed("forecast.rollout")
+    def rollout(self, window, steps):
+        """window: (N, look_back, 1) scaled inputs -> (N, steps) scaled predictions."""
+        window = np.asarray(window, dtype=np.float32).reshape(-1, self.look_back, 1)
+        lb = self.look_back
+        buf = np.empty((window.shape[0], lb + steps, 1), dtype=np.float32)
+        buf[:, :lb] = window
+        for i in range(steps):
+            with span("forecast.model_step"): buf[:, lb + i] = np.asarray(self._step(buf[:, i:i + lb]))
+        return buf[:, lb:, 0]
+
+
+def _sigmoid(x): return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+class NumpyForecastEngine(ForecastEngine):
+    """
+    The same rollout with a pure-NumPy forward pass over weights exported by
+    train_model.py --export-weights, for hosts without TensorFlow.
+    Supports what build_model() produces: stacked LSTM layers (tanh/sigmoid,
+    Keras gate order i, f, c, o) and a Dense head; Dropout is a no-op at inference.
+    """
+    def __init__(self, layers, look_back=LOOK_BACK, mtime=None):
+        self.layers = layers; self.look_back = look_back; self.mtime = mtime; self.model = None
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            kinds = [str(k) for k in data["layers"]]
+            layers = []
+            for i, kind in enumerate(kinds):
+                if kind in ("lstm", "lstm_seq"): layers.append((kind, data[f"{i}/kernel"], data[f"{i}/recurrent_kernel"], data[f"{i}/bias"]))
+                elif kind == "dense": layers.append((kind, data[f"{i}/kernel"], data[f"{i}/bias"]))
+                else: raise ValueError(f"Unsupported layer '{kind}' in {path}")
+            return cls(layers, int(data["look_back"]), os.path.getmtime(path))
+
+    def _step(self, x):
+        h_seq = np.asarray(x, dtype=np.float32)
+        for kind, *w in self.layers:
+            if kind == "dense":
+                h_seq = h_seq @ w[0] + w[1]; continue
+            W, U, b = w; units = U.shape[0]
+            xw = h_seq @ W + b  # Input projection for every timestep at once
+            h = np.zeros((h_seq.shape[0], units), dtype=np.float32); c = np.zeros_like(h)
+            out = np.empty((h_seq.shape[0], h_seq.shape[1], units), dtype=np.float32) if kind == "lstm_seq" else None
+            for t in range(h_seq.shape[1]):
+                z = xw[:, t] + h @ U
+                i = _sigmoid(z[:, :units]); f = _sigmoid(z[:, units:2 * units]); o = _sigmoid(z[:, 3 * units:])
+                c = f * c + i * np.tanh(z[:, 2 * units:3 * units]); h = o * np.tanh(c)
+                if out is not None: out[:, t] = h
+            h_seq = out if out is not None else h
+        return h_seq
+
+
+def weights_path(path):
+    """finance_brain.keras -> finance_brain.npz"""
+    return os.path.splitext(path)[0] + ".npz"
+
+def tensorflow_available():
+    return importlib.util.find_spec("tensorflow") is not None
+
+def use_numpy_engine():
+    return ENGINE == "numpy" or (ENGINE == "auto" and not tensorflow_available())
+
+def model_available(path):
+    """True when the active engine has something to load for path."""
+    return os.path.exists(weights_path(path) if use_numpy_engine() else path)
+
+_model_hashes = {}
+
+def model_version(path):
+    """Short content hash of the file the active engine loads, memoized on its mtime and size."""
+    p = weights_path(path) if use_numpy_engine() else path
+    st = os.stat(p); key = (p, st.st_mtime_ns, st.st_size)
+    digest = _model_hashes.get(key)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(p, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""): h.update(block)
+        digest = _model_hashes[key] = h.hexdigest()[:16]
+    return digest
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(path):
+    """Engine for path: the registry's current Keras model, or the exported weights without TensorFlow (rebuilt after a reload)."""
+    if use_numpy_engine():
+        wpath = weights_path(path); mtime = os.path.getmtime(wpath)
+        with _engines_lock:
+            engine = _engines.get(wpath)
+            if engine is None or engine.mtime != mtime:
+                with span("forecast.load_weights"): engine = _engines[wpath] = NumpyForecastEngine.load(wpath)
+            return engine
+    model = get_model(path)
+    with _engines_lock:
+        engine = _engines.get(path)
+        if engine is None or engine.model is not model:
+            engine = _engines[path] = ForecastEngine(model)
+        return engine
+
+
+def compare_engines(path, n=64, steps=30, runs=5, seed=0):
+    """
+    Parity and latency check between model.predict (the original per-step call),
+    the tf.function engine and the NumPy engine on the same random windows.
+    Returns the max abs difference of the NumPy rollout vs the TensorFlow one.
+    """
+    model = get_model(path); tf_engine = ForecastEngine(model); np_engine = NumpyForecastEngine.load(weights_path(path))
+    X = np.random.default_rng(seed).random((n, LOOK_BACK, 1), dtype=np.float32)
+    diff = float(np.max(np.abs(tf_engine.rollout(X, steps) - np_engine.rollout(X, steps))))
+    print(f"Parity over {n} windows x {steps} steps: max abs diff {diff:.2e} (tolerance {PARITY_TOLERANCE:.0e}) -> {'OK' if diff <= PARITY_TOLERANCE else 'FAIL'}")
+
+    def predict_rollout(window):
+        window = window.copy(); out = []
+        for _ in range(steps):
+            p = model.predict(window, verbose=0); out.append(p[0, 0])
+            window = np.append(window[:, 1:, :], p.reshape(1, 1, 1), axis=1)
+        return out
+    one = X[:1]; tf_engine.rollout(one, 1)  # trace outside the timings
+    for name, fn in [("model.predict", predict_rollout), ("tf.function engine", lambda w: tf_engine.rollout(w, steps)),
+                     ("numpy engine", lambda w: np_engine.rollout(w, steps))]:
+        times = []
+        for _ in range(runs):
+            t0 = time.perf_counter(); fn(one); times.append(time.perf_counter() - t0)
+        print(f"  {name:<20} {min(times) * 1000:>9.1f} ms per {steps}-day forecast (best of {runs})")
+    return diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the NumPy inference engine against TensorFlow.")
+    parser.add_argument("--model", default="finance_brain.keras")
+    parser.add_argument("--windows", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=30)
+    args = parser.parse_args()
+    if not os.path.exists(weights_path(args.model)): raise SystemExit(f" {weights_path(args.model)} not found. Run train_model.py --export-weights first.")
+    if compare_engines(args.model, args.windows, args.steps) > PARITY_TOLERANCE: raise SystemExit(1)
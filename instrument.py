@@ -0,0 +1,107 @@
+import atexit
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Opt-in: set FINANCE_PROFILE=1 or pass --profile to GUI.py / any script
+ENABLED = os.environ.get("FINANCE_PROFILE", "") not in ("", "0") or "--profile" in sys.argv
+DUMP_FILE = os.environ.get("FINANCE_PROFILE_FILE", "timings.json")
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]  # upper bounds; last bucket is open
+
+
+class Histogram:
+    """Latency histogram for one operation (fixed millisecond buckets plus count/total/min/max)."""
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.n = 0; self.total = 0.0; self.min = float("inf"); self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.n += 1; self.total += ms
+        if ms < self.min: self.min = ms
+        if ms > self.max: self.max = ms
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (capped at the observed max)."""
+        if not self.n: return 0.0
+        target = p / 100 * self.n; seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target: return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def summary(self):
+        return {"count": self.n, "total_ms": self.total, "mean_ms": self.total / self.n if self.n else 0.0,
+                "min_ms": self.min if self.n else 0.0, "max_ms": self.max,
+                "p50_ms": self.percentile(50), "p95_ms": self.percentile(95), "p99_ms": self.percentile(99),
+                "buckets": {(f"<={b}" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"): c
+                            for i, (b, c) in enumerate(zip(BUCKETS_MS + [BUCKETS_MS[-1]], self.counts)) if c}}
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+def record(name, ms):
+    with _lock:
+        h = _histograms.get(name)
+        if h is None: h = _histograms[name] = Histogram()
+        h.add(ms)
+
+@contextmanager
+def span(name):
+    """Times the enclosed block under `name` (a no-op unless instrumentation is enabled)."""
+    if not ENABLED:
+        yield; return
+    t0 = time.perf_counter()
+    try: yield
+    finally: record(name, (time.perf_counter() - t0) * 1000)
+
+def timed(name=None):
+    """Decorator form of span(); the name defaults to module.function."""
+    def wrap(fn):
+        label = name or f"{fn.__module__}.{fn.__name__}"
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not ENABLED: return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: record(label, (time.perf_counter() - t0) * 1000)
+        return inner
+    return wrap
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+def reset():
+    with _lock: _histograms.clear()
+
+def snapshot():
+    """{operation: summary} for everything recorded so far."""
+    with _lock: return {name: h.summary() for name, h in sorted(_histograms.items())}
+
+def report():
+    """Plain-text table of the recorded operations, slowest total first."""
+    rows = sorted(snapshot().items(), key=lambda kv: -kv[1]["total_ms"])
+    if not rows: return "No timings recorded." + ("" if ENABLED else " (Start with --profile or FINANCE_PROFILE=1.)")
+    lines = [f"{'operation':<36}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}{'total':>11}"]
+    for name, s in rows:
+        lines.append(f"{name:<36}{s['count']:>7}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['max_ms']:>10.2f}{s['total_ms']:>11.1f}")
+    return "\n".join(lines) + "\n(all times in ms)"
+
+def dump(path=None):
+    path = path or DUMP_FILE
+    with open(path, "w") as f: json.dump(snapshot(), f, indent=2)
+    return path
+
+@atexit.register
+def _dump_at_exit():
+    if ENABLED and _histograms:
+        try: dump()
+        except: pass
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+
+HOST = "127.0.0.1"
+PORT = 8765
+MIX = [("withdraw", 0.45), ("income", 0.2), ("account", 0.2), ("transfer", 0.1), ("transactions", 0.05)]
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection speaking JSON."""
+    def __init__(self, reader, writer): self.reader = reader; self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, method, path, body=None, token=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+        if token: head += f"Authorization: Bearer {token}\r\n"
+        self.writer.write((head + "\r\n").encode() + data); await self.writer.drain()
+        lines = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ")[1])
+        length = next(int(l.split(":", 1)[1]) for l in lines[1:] if l.lower().startswith("content-length:"))
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self): self.writer.close()
+
+
+async def setup_accounts(host, port, n, prefix):
+    """Creates (or reuses) n accounts and logs each in. Returns [(username, token)]."""
+    conn = await Connection.open(host, port); users = []
+    for i in range(n):
+        u = f"{prefix}{i:04d}"
+        await conn.request("POST", "/accounts", {"username": u, "password": "load", "amount": 1e9})
+        status, r = await conn.request("POST", "/login", {"username": u, "password": "load"})
+        if status != 200: raise SystemExit(f" Login failed for {u}: {r}")
+        users.append((u, r["token"]))
+    conn.close()
+    return users
+
+async def worker(host, port, users, deadline, latencies, errors, rng):
+    conn = await Connection.open(host, port)
+    names, weights = zip(*MIX)
+    try:
+        while time.perf_counter() < deadline:
+            u, token = rng.choice(users); op = rng.choices(names, weights)[0]
+            if op == "account": args = ("GET", f"/accounts/{u}")
+            elif op == "transactions": args = ("GET", f"/accounts/{u}/transactions?limit=20")
+            elif op == "transfer": args = ("POST", f"/accounts/{u}/transfer", {"to": rng.choice(users)[0], "amount": 1})
+            else: args = ("POST", f"/accounts/{u}/{op}", {"amount": rng.randint(1, 100), "category": "Load"})
+            t0 = time.perf_counter()
+            status, _ = await conn.request(*args, token=token)
+            latencies.append(time.perf_counter() - t0)
+            if status >= 500 or status == 401: errors.append(status)
+    finally: conn.close()
+
+async def run(host, port, accounts, concurrency, duration, seed):
+    users = await setup_accounts(host, port, accounts, "load")
+    latencies, errors = [], []
+    t0 = time.perf_counter(); deadline = t0 + duration
+    await asyncio.gather(*(worker(host, port, users, deadline, latencies, errors, random.Random(seed + i)) for i in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    ms = sorted(l * 1000 for l in latencies)
+    p = lambda q: ms[min(len(ms) - 1, int(q * len(ms)))] if ms else 0.0
+    print(f" {len(ms):,} requests in {elapsed:.1f}s over {concurrency} connections / {accounts} accounts")
+    print(f" {len(ms) / elapsed:,.0f} req/s | p50 {p(0.5):.2f} ms | p99 {p(0.99):.2f} ms | max {ms[-1] if ms else 0:.2f} ms | mean {statistics.fmean(ms) if ms else 0:.2f} ms | errors {len(errors)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test a running service.py (requests/s and p99 latency).")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.accounts, args.concurrency, args.duration, args.seed))
@@ -1,139 +1,414 @@
 import csv
+import heapq
+import json
 import os
-import random
+import threading
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 from abc import ABC
+from collections import OrderedDict
 
-
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import load_model
+# pandas, matplotlib, scikit-learn and TensorFlow are imported inside the functions
+# that use them, so the login screen doesn't wait for them (see prewarm()).
+from forecast import get_engine, model_available, model_version
+from instrument import span, timed
+from snapshot import get_snapshot, refresh_snapshot
+from storage import TIMESTAMP_FORMAT, AccountJournal, format_timestamp, get_store
+from synthetic import generate as generate_workload, write_store
 
 
 MODEL_FILE = "finance_brain.keras"
 LOOK_BACK = 30
+FORECAST_DAYS = 30  # Horizon summed for the monthly total
+PLOT_DAYS = 15  # Horizon drawn on the AI Overview graph
+EXPENSE_TYPES = ['Expense', 'Recurring Expense']
+TRANSACTION_TYPES = ['Income', 'Expense', 'Recurring Expense', 'Transfer In', 'Transfer Out', 'Loan Received', 'Loan Repayment']
+EXPORT_COLUMNS = ["username", "timestamp", "amount", "type", "category"]
+EXPORT_CHUNK = 20000
+FORECAST_CACHE_SIZE = 256
+FORECAST_CACHE_FILE = "forecast_cache.json"  # None keeps forecasts in memory only
+
 
+THEME = {'bg_main': '#1A1A2E', 'bg_card': '#16213E', 'text': '#EAEAEA', 'accent_blue': '#53D8FB', 'accent_pink': '#FC4EA3', 'accent_purple': '#8A4EFC'}
 
-THEME = {'bg_main': '#1A1A2E', 'bg_card': '#16213E', 'text': '#EAEAEA', 'accent_blue': '#53D8FB', 'accent_pink': '#FC4EA3'}
+_style_lock = threading.Lock()
+_style_applied = False
 
 def apply_plot_style():
-    plt.style.use('dark_background')
-    plt.rcParams.update({'figure.facecolor': THEME['bg_main'], 'axes.facecolor': THEME['bg_card'], 'savefig.facecolor': THEME['bg_main'], 'axes.grid': True, 'grid.alpha': 0.2, 'text.color': THEME['text']})
+    """Sets the global rcParams once (later calls are no-ops), so chart threads never rewrite them under each other."""
+    global _style_applied
+    with _style_lock:
+        if _style_applied: return
+        import matplotlib, matplotlib.style
+        matplotlib.style.use('dark_background')
+        matplotlib.rcParams.update({'figure.facecolor': THEME['bg_main'], 'axes.facecolor': THEME['bg_card'], 'savefig.facecolor': THEME['bg_main'], 'axes.grid': True, 'grid.alpha': 0.2, 'text.color': THEME['text']})
+        _style_applied = True
 
 # DATA HELPERS (User Management) 
 
+class ClientRegistry:
+    """
+    The clients list plus a dict index by lowercased username, so login,
+    registration and transfers look accounts up in O(1). Behaves like the
+    plain list it replaces (iteration, len, clients[i], append).
+    """
+    def __init__(self, clients=()):
+        self.clients = []; self.index = {}
+        for c in clients: self.append(c)
+    def append(self, c):
+        self.clients.append(c); self.index.setdefault(c.uname.lower(), len(self.clients) - 1)  # Index last: a lookup from another thread never sees a position past the end
+    def position(self, username): return self.index.get(str(username).lower())
+    def get(self, username):
+        i = self.position(username)
+        return None if i is None else self.clients[i]
+    def __contains__(self, username): return str(username).lower() in self.index
+    def __iter__(self): return iter(self.clients)
+    def __len__(self): return len(self.clients)
+    def __getitem__(self, i): return self.clients[i]
+
+def as_registry(clients):
+    return clients if isinstance(clients, ClientRegistry) else ClientRegistry(clients)
+
+USER_HEADER = ["username", "password", "amount", "budget", "total_spent", "loans", "recurring"]
+account_journal = AccountJournal("users.txt", USER_HEADER)
+
+def client_from_row(row):
+    uname, pw, amt, bud, spent, loan, rec_str = row[:7]
+    recurring = []
+    if rec_str:
+        for item in rec_str.split(";"):
+            p = item.split("|")
+            if len(p) == 4: recurring.append((float(p[0]), p[1], int(p[2]), datetime.strptime(p[3], '%Y-%m-%d %H:%M:%S')))
+    c = StandardAccount(uname, pw, float(amt))
+    c.set_budget(float(bud)); c.total_spent = float(spent); c.loans = float(loan); c.recurring = recurring
+    return c
+
+def client_row(c):
+    rec_str = ";".join([f"{i[0]}|{i[1]}|{i[2]}|{i[3].strftime('%Y-%m-%d %H:%M:%S')}" for i in c.recurring])
+    return [c.uname, c.password, c.amount, c.budget, c.total_spent, c.loans, rec_str]
+
 def load_all_clients():
-    clients = []
-    if not os.path.exists("users.txt"): return clients
+    clients = ClientRegistry()
     try:
-        with open("users.txt", "r") as f:
-            reader = csv.reader(f); next(reader, None)
-            for row in reader:
-                if len(row) >= 7:
-                    uname, pw, amt, bud, spent, loan, rec_str = row
-                    recurring = []
-                    if rec_str:
-                        for item in rec_str.split(";"):
-                            p = item.split("|")
-                            if len(p) == 4: recurring.append((float(p[0]), p[1], int(p[2]), datetime.strptime(p[3], '%Y-%m-%d %H:%M:%S')))
-                    c = StandardAccount(uname, pw, float(amt))
-                    c.set_budget(float(bud)); c.total_spent = float(spent); c.loans = float(loan); c.recurring = recurring
-                    clients.append(c)
+        for row in account_journal.load_rows():
+            if len(row) >= 7: clients.append(client_from_row(row))
     except: pass
+    with _dirty_lock: _dirty_clients.clear()  # Freshly loaded state is already on disk
     return clients
 
 def save_all_clients(clients):
+    """Persists only the accounts changed since the last save (see AccountJournal)."""
+    changed = take_changed_clients()
+    save_client_rows(changed, [client_row(c) for c in changed])
+
+def take_changed_clients():
+    """Accounts changed since the last save, handed over to the caller to save with save_client_rows()."""
+    with _dirty_lock:
+        changed = list(_dirty_clients.values()); _dirty_clients.clear()
+    return changed
+
+def save_client_rows(changed, rows):
+    """Journals the rows built from `changed`; on failure the accounts stay marked for the next save."""
     try:
-        temp = "users.txt.tmp"
-        with open(temp, "w", newline='') as f:
-            w = csv.writer(f); w.writerow(["username", "password", "amount", "budget", "total_spent", "loans", "recurring"])
-            for c in clients:
-                rec_str = ";".join([f"{i[0]}|{i[1]}|{i[2]}|{i[3].strftime('%Y-%m-%d %H:%M:%S')}" for i in c.recurring])
-                w.writerow([c.uname, c.password, c.amount, c.budget, c.total_spent, c.loans, rec_str])
-        os.replace(temp, "users.txt")
-    except: pass
+        if rows: get_store().flush()  # Ledger rows first, as the CSV was: account state never gets ahead of the ledger
+        account_journal.write(rows)
+    except:
+        with _dirty_lock:
+            for c in changed: _dirty_clients.setdefault(c.uname, c)
 
 def create_client(clients, u, p, a):
-    if any(c.uname == u.lower() for c in clients): return " User exists."
-    clients.append(StandardAccount(u, p, a)); save_all_clients(clients); return " Created!"
+    if u.lower() in as_registry(clients): return " User exists."
+    c = StandardAccount(u, p, a); clients.append(c)
+    save_client_rows([c], [client_row(c)])  # Just the new account: others may be mid-operation on another thread
+    return " Created!"
 
 def validate(clients, n, p):
-    for i, c in enumerate(clients):
-        if c.uname == n.lower() and c.validate_pass(p): return i
+    registry = as_registry(clients)
+    i = registry.position(n)
+    if i is not None and registry[i].validate_pass(p): return i
     return None
 
 def find_client_by_username(clients, n):
-    for c in clients:
-        if c.uname == n.lower(): return c
-    return None
+    return as_registry(clients).get(n)
 
-def generate_dummy_data_logic(username):
-    # Generates 6 months of data for testing
-    data = []
-    curr = datetime.now() - timedelta(days=180)
-    for _ in range(180):
-        if random.random() > 0.3:
-            data.append([username, curr.strftime("%Y-%m-%d 12:00:00"), random.randint(500, 5000), "Expense", "Test"])
-        curr += timedelta(days=1)
-    
-    df = pd.DataFrame(data, columns=["username", "timestamp", "amount", "type", "category"])
-    if not os.path.exists("transactions.csv"):
-        df.to_csv("transactions.csv", index=False)
-    else:
-        df.to_csv("transactions.csv", mode='a', header=False, index=False)
+def generate_dummy_data_logic(username, days=180, seed=None):
+    # Generates 6 months of data for testing (see synthetic.py for many users at once)
+    write_store(generate_workload(1, days, seed, names=[username.lower()]))
     return " Demo Data Generated!"
 
-def export_user_data(u): return "Not Implemented"
-def generate_report(u): return "Not Implemented"
+def export_formats():
+    """CSV always; Parquet and Feather when pyarrow is installed."""
+    try: import pyarrow  # noqa: F401
+    except ImportError: return ["csv"]
+    return ["csv", "parquet", "feather"]
+
+@timed()
+def export_user_data(u, path=None, fmt="csv", start=None, end=None, types=None, progress=None):
+    """
+    Streams one user's transactions to a file, EXPORT_CHUNK rows at a time.
+    start/end are dates (end inclusive), types limits the transaction types,
+    and progress(done, total) is called after every chunk.
+    """
+    if fmt not in export_formats(): return f" {fmt} export needs pyarrow (pip install pyarrow)."
+    import pandas as pd
+    path = path or f"{u.lower()}_transactions.{fmt}"
+    end = (pd.Timestamp(end) + pd.Timedelta(days=1)).strftime('%Y-%m-%d') if end else None
+    store = get_store(); total = store.count(u, start, end, types); done = 0
+    temp = path + ".tmp"
+    try:
+        if fmt == "csv":
+            with open(temp, "w", newline='') as f:
+                w = csv.writer(f); w.writerow(EXPORT_COLUMNS)
+                for chunk in store.iter_rows(u, start, end, types, EXPORT_CHUNK):
+                    w.writerows(tuple(r)[1:] for r in chunk); done += len(chunk)
+                    if progress: progress(done, total)
+        else:
+            import pyarrow as pa, pyarrow.parquet as pq
+            schema = pa.schema([("username", pa.string()), ("timestamp", pa.string()), ("amount", pa.float64()), ("type", pa.string()), ("category", pa.string())])
+            writer = pq.ParquetWriter(temp, schema) if fmt == "parquet" else pa.ipc.new_file(temp, schema)
+            try:
+                for chunk in store.iter_rows(u, start, end, types, EXPORT_CHUNK):
+                    cols = list(zip(*(tuple(r)[1:] for r in chunk)))
+                    writer.write_table(pa.Table.from_arrays([pa.array(c, type=t) for c, t in zip(cols, schema.types)], schema=schema)); done += len(chunk)
+                    if progress: progress(done, total)
+            finally: writer.close()
+        os.replace(temp, path)
+    except Exception as e:
+        if os.path.exists(temp): os.remove(temp)
+        return f" Export failed: {e}"
+    return f" Exported {done:,} rows to {path}"
+
+@timed()
+def generate_report(u, months=6):
+    """Plain-text summary of the last few months and top spending categories, built from the aggregate tables."""
+    store = get_store()
+    rows = store.monthly_totals(u)
+    if not rows: return " No transactions to report."
+    by_month = {}
+    for r in rows: by_month.setdefault(r['month'], {})[r['type']] = r['total']
+    lines = [f"Financial Report: {u.title()}", f"Generated {datetime.now():%Y-%m-%d %H:%M}", "",
+             f"{'Month':<9}{'Income':>16}{'Expenses':>16}{'Net':>16}"]
+    for month in sorted(by_month)[-months:]:
+        t = by_month[month]
+        income = t.get('Income', 0) + t.get('Transfer In', 0) + t.get('Loan Received', 0)
+        spent = sum(t.get(k, 0) for k in EXPENSE_TYPES + ['Transfer Out', 'Loan Repayment'])
+        lines.append(f"{month:<9}{income:>16,.2f}{spent:>16,.2f}{income - spent:>16,.2f}")
+    cats = store.category_totals(u, EXPENSE_TYPES, merge_types=True)  # Rent can be both Expense and Recurring Expense
+    if cats:
+        lines += ["", "Top Spending Categories"]
+        lines += [f"  {r['category'] or '-':<20}{r['total']:>16,.2f}  ({r['n']} payments)" for r in cats[:5]]
+    return "\n".join(lines)
+
+def log_transactions(rows):
+    """Writes (username, timestamp, amount, type, category) rows to the ledger as one unit."""
+    get_store().append_many(rows)
+    for u, ts, a, t, _ in rows: series_cache.record(u, ts, a, t)
+
+# Change notifications: callbacks receive the Client after any account operation
+_change_listeners = []
+
+def on_account_change(callback): _change_listeners.append(callback)
+
+# Accounts changed since the last save_all_clients, keyed by username
+_dirty_clients = {}
+_dirty_lock = threading.Lock()
 
 class Client(ABC):
-    def __init__(self, u, p, a): self.uname=u.lower(); self.password=str(p); self.amount=a; self.total_spent=0; self.budget=0; self.loans=0; self.recurring=[]
+    def __init__(self, u, p, a): self.uname=u.lower(); self.password=str(p); self.amount=a; self.total_spent=0; self.budget=0; self.loans=0; self.recurring=[]; self.mark_dirty()
+    def mark_dirty(self):
+        with _dirty_lock: _dirty_clients[self.uname] = self
+        for callback in _change_listeners: callback(self)
     def validate_pass(self, p): return self.password == str(p)
-    def set_budget(self, b): self.budget = b; return "Set."
-    def add_income(self, a): self.amount += a; self.log(a, "Income", "General"); return "Added."
+    def set_budget(self, b): self.budget = b; self.mark_dirty(); return "Set."
+    def add_income(self, a): self.amount += a; self.mark_dirty(); self.log(a, "Income", "General"); return "Added."
     def withdraw(self, a, c):
         if a > self.amount: return " Funds low."
-        self.amount -= a; self.total_spent += a; self.log(a, "Expense", c)
+        self.amount -= a; self.total_spent += a; self.mark_dirty(); self.log(a, "Expense", c)
         return " Budget!" if self.budget > 0 and self.total_spent > self.budget else " Spent."
     def transfer(self, rx, a):
         if self.amount < a: return " Funds low."
-        self.amount -= a; rx.amount += a; self.log(a, "Transfer Out", rx.uname); rx.log(a, "Transfer In", self.uname)
+        self.amount -= a; rx.amount += a; self.mark_dirty(); rx.mark_dirty()
+        ts = datetime.now()  # Both legs are written as one unit
+        log_transactions([(self.uname, ts, a, "Transfer Out", rx.uname), (rx.uname, ts, a, "Transfer In", self.uname)])
         return " Sent."
-    def request_loan(self, a): self.amount+=a; self.loans+=a; self.log(a,"Loan Received","Bank"); return " Approved."
-    def repay_loan(self, a): self.amount-=a; self.loans-=a; self.log(a,"Loan Repayment","Bank"); return " Paid."
-    def process_recurring(self): pass 
-    def log(self, a, t, c):
-        with open("transactions.csv", "a", newline='') as f: csv.writer(f).writerow([self.uname, datetime.now(), a, t, c])
+    def request_loan(self, a): self.amount+=a; self.loans+=a; self.mark_dirty(); self.log(a,"Loan Received","Bank"); return " Approved."
+    def repay_loan(self, a): self.amount-=a; self.loans-=a; self.mark_dirty(); self.log(a,"Loan Repayment","Bank"); return " Paid."
+    def add_recurring(self, a, c, interval_days, first_due):
+        self.recurring.append((float(a), c, int(interval_days), first_due)); self.mark_dirty()
+        recurring_scheduler.push(self, len(self.recurring) - 1)
+        return " Scheduled."
+    def process_recurring(self, now=None): return recurring_scheduler.run_due(now, clients=[self])
+    def log(self, a, t, c): log_transactions([(self.uname, datetime.now(), a, t, c)])
 class StandardAccount(Client): pass
 class ChildAccount(Client): pass
 
 
+class RecurringScheduler:
+    """
+    Due recurring payments for all accounts in one heap keyed by next-due time.
+    run_due() pops only the items that are due, charges every missed period of
+    an item in one step (catch-up after downtime), and writes all resulting
+    "Recurring Expense" rows to the ledger in a single batch.
+    Heap entries are (due, seq, client, index); an entry whose item has since
+    moved is skipped when popped.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.heap = []; self.seq = 0
 
+    def load(self, clients):
+        with self.lock:
+            self.heap = []
+            for c in clients:
+                for i, item in enumerate(c.recurring):
+                    self.heap.append((item[3], self.seq, c, i)); self.seq += 1
+            heapq.heapify(self.heap)
+
+    def push(self, client, i):
+        with self.lock:
+            heapq.heappush(self.heap, (client.recurring[i][3], self.seq, client, i)); self.seq += 1
+
+    def charge(self, client, i, now, rows):
+        """Charges every period of item i due by now (as far as funds allow); returns periods charged."""
+        amount, cat, interval, due = client.recurring[i]
+        step = timedelta(days=max(interval, 1))
+        periods = (now - due) // step + 1
+        if amount > 0: periods = min(periods, int(client.amount // amount))
+        if periods <= 0: return 0
+        rows.extend((client.uname, due + k * step, amount, "Recurring Expense", cat) for k in range(periods))
+        client.amount -= amount * periods; client.total_spent += amount * periods
+        client.recurring[i] = (amount, cat, interval, due + periods * step); client.mark_dirty()
+        return periods
+
+    def run_due(self, now=None, clients=None):
+        """Processes due items (all accounts, or only clients). Returns the number of payments logged."""
+        now = now or datetime.now(); rows = []
+        if clients is not None:
+            for c in clients:
+                for i in range(len(c.recurring)):
+                    if c.recurring[i][3] <= now and self.charge(c, i, now, rows): self.push(c, i)
+        else:
+            with self.lock:
+                retry = []
+                while self.heap and self.heap[0][0] <= now:
+                    due, _, c, i = heapq.heappop(self.heap)
+                    if i >= len(c.recurring) or c.recurring[i][3] != due: continue  # stale entry
+                    self.charge(c, i, now, rows)
+                    entry = (c.recurring[i][3], self.seq, c, i); self.seq += 1
+                    if entry[0] <= now: retry.append(entry)
+                    else: heapq.heappush(self.heap, entry)
+                for entry in retry: heapq.heappush(self.heap, entry)  # Unaffordable items wait for the next run
+        if rows: get_store().append_many(rows)  # Series caches see the new row count and rebuild
+        return len(rows)
+
+    def next_due(self):
+        with self.lock: return self.heap[0][0] if self.heap else None
+
+recurring_scheduler = RecurringScheduler()
+
+
+
+def parse_timestamps(values):
+    # Ledger timestamps are all in the canonical fixed format (see storage.TIMESTAMP_FORMAT)
+    import pandas as pd
+    return pd.to_datetime(values, format=TIMESTAMP_FORMAT, errors='coerce')
+
+def build_daily_series(df_user):
+    """Daily expense totals from raw rows (days without spending are 0)."""
+    # Robust Date Parse
+    df_user['timestamp'] = parse_timestamps(df_user['timestamp'])
+    df_user = df_user.dropna(subset=['timestamp'])
+    return df_user.set_index('timestamp').resample('D')['amount'].sum().fillna(0)
+
+def merge_daily(a, b):
+    """Sum of two daily series over the union of their days (missing days are 0)."""
+    import pandas as pd
+    if a is None: return b
+    s = a.add(b, fill_value=0)
+    return s.reindex(pd.date_range(s.index[0], s.index[-1], freq='D', name=a.index.name), fill_value=0).rename(a.name)
+
+def fit_scaler(daily):
+    # Fit Scaler on USER data (Adapts the brain to this user's wealth)
+    from sklearn.preprocessing import MinMaxScaler
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaler.fit(daily.values.reshape(-1, 1))
+    return scaler
+
+
+class SeriesCache:
+    """
+    Per-user daily expense series and fitted scaler, keyed by username.
+    Entries carry the store version they were built from; Client.log folds
+    new expenses into the cached series so a fresh transaction never forces
+    a full re-read and re-parse of the user's history. A miss sums the user's
+    range of the mapped snapshot (if one is published) and only reads and
+    parses the rows added after it.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # uname -> (version, daily, scaler)
+        self.hits = 0; self.misses = 0; self.updates = 0
+
+    def get(self, username):
+        u = username.lower(); version = get_store().version(u)
+        with self.lock:
+            entry = self.entries.get(u)
+            if entry and entry[0] == version:
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+        snap = get_snapshot(db_path=get_store().path)
+        with span("series.snapshot"): daily = snap.daily_series(u, EXPENSE_TYPES) if snap is not None else None
+        with span("series.read"): df_user = get_store().frame(u, types=EXPENSE_TYPES, after_id=snap.max_id if snap is not None else None)
+        with span("series.parse"):
+            if not df_user.empty: daily = merge_daily(daily, build_daily_series(df_user))
+            scaler = fit_scaler(daily) if daily is not None and len(daily) else None
+        with self.lock: self.entries[u] = (version, daily, scaler)
+        return daily, scaler
+
+    def record(self, username, timestamp, amount, t):
+        """Applies one freshly logged row to the cached entry, if it is current."""
+        u = username.lower()
+        with self.lock:
+            entry = self.entries.get(u)
+            if not entry: return
+            n, daily, scaler = entry
+            if t in EXPENSE_TYPES:
+                import pandas as pd
+                day = parse_timestamps(pd.Series([format_timestamp(timestamp)]))[0]
+                if pd.isna(day): del self.entries[u]; return
+                day = day.normalize()
+                if daily is None or not len(daily):
+                    daily = pd.Series([0.0], index=pd.DatetimeIndex([day], freq='D'), name='amount')
+                elif day < daily.index[0] or day > daily.index[-1]:
+                    daily = daily.reindex(pd.date_range(min(day, daily.index[0]), max(day, daily.index[-1]), freq='D'), fill_value=0)
+                else: daily = daily.copy()
+                daily[day] += amount
+                scaler = fit_scaler(daily)
+                self.updates += 1
+            self.entries[u] = (n + 1, daily, scaler)
+
+    def invalidate(self, username=None):
+        with self.lock:
+            if username is None: self.entries.clear()
+            else: self.entries.pop(username.lower(), None)
+
+    def stats(self):
+        with self.lock: return {"hits": self.hits, "misses": self.misses, "updates": self.updates, "users": len(self.entries)}
+
+series_cache = SeriesCache()
+
+
+@timed()
 def get_user_sequence(username):
     """
-    1. Loads User Data.
+    1. Loads User Data (from the series cache when nothing has changed).
     2. Scales it to 0-1 (matching the Master Brain's language).
     3. Returns the last 30 days as a sequence.
     """
     try:
-        if not os.path.exists("transactions.csv"): return None, None, None
-        df = pd.read_csv("transactions.csv")
-        df_user = df[df['username'] == username.lower()].copy()
-        df_user = df_user[df_user['type'].isin(['Expense', 'Recurring Expense'])]
-        
-        # Robust Date Parse
-        df_user['timestamp'] = pd.to_datetime(df_user['timestamp'], dayfirst=True, format='mixed', errors='coerce')
-        df_user = df_user.dropna(subset=['timestamp'])
-        
-        daily = df_user.set_index('timestamp').resample('D')['amount'].sum().fillna(0)
-        
-        if len(daily) < LOOK_BACK: return None, None, None # Needs 30 days
-        
-        # Fit Scaler on USER data (Adapts the brain to this user's wealth)
-        scaler = MinMaxScaler(feature_range=(0, 1))
-        scaler.fit(daily.values.reshape(-1, 1))
+        daily, scaler = series_cache.get(username)
+        if daily is None or len(daily) < LOOK_BACK: return None, None, None # Needs 30 days
         
         last_30 = daily.values[-LOOK_BACK:]
         scaled_seq = scaler.transform(last_30.reshape(-1, 1))
@@ -141,44 +416,93 @@ def get_user_sequence(username):
         return scaled_seq.reshape(1, LOOK_BACK, 1), scaler, daily
     except: return None, None, None
 
-def predict_next_month_expense(username):
-    if not os.path.exists(MODEL_FILE): return " Model not trained! Run train_model.py first."
-    
-    model = load_model(MODEL_FILE)
-    X_user, scaler, _ = get_user_sequence(username)
-    
-    if X_user is None: return " Not enough data (Need 30 days)."
-    
-    # Predict 30 days
-    curr = X_user
-    total = 0
-    for _ in range(30):
-        p = model.predict(curr, verbose=0)
-        val = scaler.inverse_transform(p)[0][0]
-        total += val
-        curr = np.append(curr[0][1:], p).reshape(1, LOOK_BACK, 1)
-        
-    return f"AI Forecast (30 Days): PKR {max(0, total):,.2f}"
+class ForecastCache:
+    """
+    Finished forecasts (PKR per day, plus the graph drawn from them), LRU-bounded.
+    Keyed by (username, store version, model hash), so an entry is only reused while
+    neither the user's history nor the model has changed. With a path, entries are
+    kept on disk and the last forecast is available straight after a restart.
+    """
+    def __init__(self, size=FORECAST_CACHE_SIZE, path=FORECAST_CACHE_FILE):
+        self.lock = threading.Lock()
+        self.size = size; self.path = path; self.loaded = path is None
+        self.entries = OrderedDict()  # key -> {"preds": [...], "plot": path or None}
+        self.hits = 0; self.misses = 0
 
-def predict_future_expense_data(username):
-    if not os.path.exists(MODEL_FILE): return {"message": "Model Missing"}
-    
-    model = load_model(MODEL_FILE)
+    def _load(self):
+        self.loaded = True
+        try:
+            with open(self.path) as f:
+                for u, version, model, entry in json.load(f): self.entries[(u, version, model)] = entry
+        except: pass
+
+    def _save(self):
+        if not self.path: return
+        temp = self.path + ".tmp"
+        try:
+            with open(temp, "w") as f: json.dump([list(k) + [v] for k, v in self.entries.items()], f)
+            os.replace(temp, self.path)
+        except: pass
+
+    def get(self, key):
+        with self.lock:
+            if not self.loaded: self._load()
+            entry = self.entries.get(key)
+            if entry is None: self.misses += 1; return None
+            self.hits += 1; self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, preds=None, plot=None):
+        with self.lock:
+            if not self.loaded: self._load()
+            entry = self.entries.get(key) or {"preds": None, "plot": None}
+            if preds is not None: entry = {"preds": [float(p) for p in preds], "plot": None}
+            if plot is not None:
+                for other in self.entries.values():  # One image file per user: older entries no longer own it
+                    if other.get("plot") == plot: other["plot"] = None
+                entry["plot"] = plot
+            self.entries[key] = entry; self.entries.move_to_end(key)
+            while len(self.entries) > self.size: self.entries.popitem(last=False)
+            self._save()
+
+    def clear(self):
+        with self.lock: self.entries.clear(); self._save()
+
+    def stats(self):
+        with self.lock: return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+forecast_cache = ForecastCache()
+
+def forecast_key(username):
+    u = username.lower()
+    return (u, get_store().version(u), model_version(MODEL_FILE))
+
+@timed()
+def forecast_user(username, steps=FORECAST_DAYS, key=None):
+    """
+    Runs one rollout for the user, or reuses the cached one.
+    Returns the predicted daily amounts (PKR) and the daily history, or (None, None).
+    """
+    key = key or forecast_key(username)
+    entry = forecast_cache.get(key)
+    if entry and entry["preds"] and len(entry["preds"]) >= steps:
+        return np.asarray(entry["preds"][:steps]), series_cache.get(username)[0]
     X_user, scaler, daily = get_user_sequence(username)
-    
-    if X_user is None: return {"message": "Need 30 days data"}
-    
+    if X_user is None: return None, None
+    # Rollouts are autoregressive, so a shorter horizon is a prefix of the monthly one
+    preds = get_engine(MODEL_FILE).rollout(X_user, max(steps, FORECAST_DAYS))[0]
+    money_preds = scaler.inverse_transform(preds.reshape(-1, 1)).ravel().astype(np.float64)  # same values as a cache hit
+    forecast_cache.put(key, money_preds)
+    return money_preds[:steps], daily
+
+def format_forecast_total(money_preds):
+    return f"AI Forecast (30 Days): PKR {max(0, float(np.sum(money_preds[:FORECAST_DAYS]))):,.2f}"
+
+@timed()
+def plot_forecast(username, daily, money_preds):
+    import matplotlib.pyplot as plt
     apply_plot_style(); plt.switch_backend('Agg')
-    
-    # Predict 15 days for graph
-    preds = []
-    curr = X_user
-    for _ in range(15):
-        p = model.predict(curr, verbose=0)
-        preds.append(p[0, 0])
-        curr = np.append(curr[0][1:], p).reshape(1, LOOK_BACK, 1)
-        
-    money_preds = scaler.inverse_transform(np.array(preds).reshape(-1, 1))
+    money_preds = money_preds[:PLOT_DAYS]
     
     fig, ax = plt.subplots(figsize=(10, 5))
     
@@ -189,7 +513,7 @@ def predict_future_expense_data(username):
     
     # Forecast
     last = daily.index[-1]
-    fut_dates = [last + timedelta(days=i+1) for i in range(15)]
+    fut_dates = [last + timedelta(days=i+1) for i in range(len(money_preds))]
     ax.plot(fut_dates, money_preds, color=THEME['accent_pink'], linestyle='--', marker='x', label="AI Forecast")
     
     ax.legend()
@@ -197,23 +521,126 @@ def predict_future_expense_data(username):
     plt.savefig(path); plt.close()
     return {"message": "Success", "plot_path": path}
 
+def forecast_plot(username, key, daily, money_preds):
+    """The forecast graph, redrawn only when the cached one is for an older forecast (or gone)."""
+    entry = forecast_cache.get(key)
+    if entry and entry["plot"] and os.path.exists(entry["plot"]): return {"message": "Success", "plot_path": entry["plot"]}
+    grp = plot_forecast(username, daily, money_preds)
+    forecast_cache.put(key, plot=grp["plot_path"])
+    return grp
+
+@timed()
+def predict_next_month_expense(username):
+    if not model_available(MODEL_FILE): return " Model not trained! Run train_model.py first."
+    money_preds, _ = forecast_user(username, FORECAST_DAYS)
+    if money_preds is None: return " Not enough data (Need 30 days)."
+    return format_forecast_total(money_preds)
+
+@timed()
+def predict_future_expense_data(username):
+    if not model_available(MODEL_FILE): return {"message": "Model Missing"}
+    key = forecast_key(username)
+    money_preds, daily = forecast_user(username, PLOT_DAYS, key)
+    if money_preds is None: return {"message": "Need 30 days data"}
+    return forecast_plot(username, key, daily, money_preds)
+
+@timed()
+def predict_overview(username):
+    """30-day total and 15-day graph for AI Overview, both from a single rollout."""
+    if not model_available(MODEL_FILE): return " Model not trained! Run train_model.py first.", {"message": "Model Missing"}
+    key = forecast_key(username)
+    money_preds, daily = forecast_user(username, FORECAST_DAYS, key)
+    if money_preds is None: return " Not enough data (Need 30 days).", {"message": "Need 30 days data"}
+    return format_forecast_total(money_preds), forecast_plot(username, key, daily, money_preds)
+
+def cached_overview(username):
+    """predict_overview's result if it is already cached (nothing computed), else None."""
+    try:
+        if not model_available(MODEL_FILE): return None
+        entry = forecast_cache.get(forecast_key(username))
+    except: return None
+    if not entry or not entry["preds"] or not entry["plot"] or not os.path.exists(entry["plot"]): return None
+    return format_forecast_total(entry["preds"]), {"message": "Success", "plot_path": entry["plot"]}
+
+def prewarm(username=None):
+    """
+    Pays the one-off costs ahead of time, on a background thread after login:
+    imports pandas/matplotlib/scikit-learn/TensorFlow, loads and traces the
+    model, refreshes the ledger snapshot and builds the user's series, so the
+    first chart or forecast is quick.
+    """
+    with span("startup.prewarm"):
+        import pandas, sklearn.preprocessing, matplotlib.figure, matplotlib.backends.backend_agg  # noqa: F401
+        apply_plot_style()
+        if model_available(MODEL_FILE): get_engine(MODEL_FILE).rollout(np.zeros((1, LOOK_BACK, 1)), 1)
+        refresh_snapshot(get_store().path)  # Rebuilt only once enough new rows have piled up
+        if username: series_cache.get(username)
+
+CHART_SIZES = {"monthly": (8, 4), "pie": (6, 6)}  # figsize in inches; pixel width is chosen by the caller
+CHART_CACHE_SIZE = 16
+_chart_cache = OrderedDict()
+_chart_lock = threading.Lock()
+
+def monthly_series(username, t):
+    """Month-end indexed totals of one transaction type, read from the monthly_totals aggregate (gaps are 0)."""
+    import pandas as pd
+    rows = get_store().monthly_totals(username, [t])
+    if not rows: return pd.Series(dtype=float)
+    s = pd.Series([r['total'] for r in rows], index=pd.PeriodIndex([r['month'] for r in rows], freq='M'))
+    s = s.reindex(pd.period_range(s.index.min(), s.index.max(), freq='M'), fill_value=0.0)
+    s.index = s.index.to_timestamp(how='end').normalize()
+    return s
+
+def chart_data(username):
+    """Monthly expense trend and per-category expense totals for a user (from the pre-summed tables)."""
+    import pandas as pd
+    m = -monthly_series(username, 'Expense')
+    cats = get_store().category_totals(username, ['Expense'])
+    pie = pd.Series({r['category']: r['total'] for r in cats}, dtype=float).sort_index()
+    return m, pie
+
+def build_chart_figures(m, pie, widths=None):
+    """Figures for the Analytics tab; with widths (px) the dpi is set so they render at that width."""
+    from matplotlib.figure import Figure
+    apply_plot_style()
+    widths = widths or {}
+    figs = {}
+    fig = Figure(figsize=CHART_SIZES["monthly"], dpi=widths.get("monthly", 800) / CHART_SIZES["monthly"][0])
+    ax = fig.add_subplot()
+    ax.plot(m.index, m.values, color=THEME['accent_blue'], marker='o')
+    fig.tight_layout(); figs["monthly"] = fig
+    if not pie.empty:
+        fig = Figure(figsize=CHART_SIZES["pie"], dpi=widths.get("pie", 600) / CHART_SIZES["pie"][0])
+        ax = fig.add_subplot()
+        ax.pie(pie, autopct='%1.1f%%', colors=[THEME['accent_pink'], THEME['accent_blue'], THEME['accent_purple']])
+        figs["pie"] = fig
+    return figs
+
+@timed()
+def render_charts(username, widths):
+    """
+    Renders the Analytics charts straight to RGBA arrays at the requested pixel widths.
+    Thread-safe (no pyplot state), and cached per user until their history changes.
+    """
+    key = (username.lower(), get_store().version(username), tuple(sorted(widths.items())))
+    with _chart_lock:
+        if key in _chart_cache:
+            _chart_cache.move_to_end(key); return _chart_cache[key]
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    m, pie = chart_data(username)
+    images = {}
+    for name, fig in build_chart_figures(m, pie, widths).items():
+        with span(f"charts.draw_{name}"):
+            canvas = FigureCanvasAgg(fig); canvas.draw()
+            images[name] = np.asarray(canvas.buffer_rgba()).copy()
+    with _chart_lock:
+        _chart_cache[key] = images
+        while len(_chart_cache) > CHART_CACHE_SIZE: _chart_cache.popitem(last=False)
+    return images
+
+@timed()
 def plot_charts(username):
-    apply_plot_style(); plt.switch_backend('Agg')
     try:
-        df = pd.read_csv("transactions.csv"); df = df[df['username']==username.lower()]
-        df['timestamp'] = pd.to_datetime(df['timestamp'], dayfirst=True, format='mixed', errors='coerce')
-        df = df.dropna(subset=['timestamp'])
-        
-        df_exp = df[df['type']=='Expense'].copy(); df_exp['amount'] *= -1
-        m = df_exp.resample("M", on="timestamp")['amount'].sum()
-        
-        fig, ax = plt.subplots(figsize=(8,4))
-        ax.plot(m.index, m.values, color=THEME['accent_blue'], marker='o')
-        plt.tight_layout(); plt.savefig(f"{username}_monthly_trend.png"); plt.close()
-        
-        pie = df[df['type']=='Expense'].groupby('category')['amount'].sum()
-        if not pie.empty:
-            fig, ax = plt.subplots(figsize=(6,6))
-            ax.pie(pie, autopct='%1.1f%%', colors=[THEME['accent_pink'], THEME['accent_blue'], THEME['accent_purple']])
-            plt.savefig(f"{username}_expense_pie.png"); plt.close()
+        for name, fig in build_chart_figures(*chart_data(username)).items():
+            fig.savefig(f"{username}_monthly_trend.png" if name == "monthly" else f"{username}_expense_pie.png")
     except: pass
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import json
+import secrets
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from logic import (
+    create_client, validate, load_all_clients, save_all_clients, predict_next_month_expense,
+    generate_report, recurring_scheduler, forecast_user, client_row, take_changed_clients, save_client_rows
+)
+from storage import get_store
+
+
+HOST = "127.0.0.1"
+PORT = 8765
+SAVE_INTERVAL = 5.0  # Seconds between account saves (transactions are committed by the store itself)
+IO_WORKERS = 8  # Ledger and users.txt work
+MODEL_WORKERS = 2  # Forecasts, kept apart so they never starve account operations
+MAX_BODY = 1 << 20
+FAILURES = ("Funds low.", "User exists.")
+STATUS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+          409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message); self.status = status
+
+
+class FinanceService:
+    """
+    Headless HTTP/JSON front end to the account operations and forecasts.
+    1. One asyncio loop accepts connections (keep-alive, JSON in and out).
+    2. Ledger/users.txt work runs on an IO thread pool and forecasts on a
+       separate model pool, so the loop itself never blocks.
+    3. Operations on one account are serialized with a per-account lock;
+       a transfer takes both locks in name order, so it can't deadlock.
+    """
+    def __init__(self):
+        self.clients = load_all_clients()
+        recurring_scheduler.load(self.clients)
+        self.io = ThreadPoolExecutor(IO_WORKERS, thread_name_prefix="io")
+        self.models = ThreadPoolExecutor(MODEL_WORKERS, thread_name_prefix="model")
+        self.locks = {}  # username -> asyncio.Lock
+        self.create_lock = None  # Made in serve(): before 3.10 a lock binds to the loop current at creation
+        self.tokens = {}  # token -> username
+        self.requests = 0
+        self.public = {("GET", "health"): self.health, ("POST", "accounts"): self.create_account, ("POST", "login"): self.login}
+        self.routes = {  # /accounts/<username>[/<action>], token required
+            ("GET", "account"): self.account,
+            ("POST", "income"): lambda c, b: self.operate(c, lambda: c.add_income(amount(b))),
+            ("POST", "withdraw"): lambda c, b: self.operate(c, lambda: c.withdraw(amount(b), str(b.get("category") or "General"))),
+            ("POST", "loan"): lambda c, b: self.operate(c, lambda: c.request_loan(amount(b))),
+            ("POST", "repay"): lambda c, b: self.operate(c, lambda: c.repay_loan(amount(b))),
+            ("POST", "budget"): lambda c, b: self.operate(c, lambda: c.set_budget(amount(b))),
+            ("POST", "transfer"): self.transfer,
+            ("GET", "transactions"): self.transactions,
+            ("GET", "forecast"): self.forecast,
+            ("GET", "report"): self.report,
+        }
+
+    def lock(self, username):
+        lock = self.locks.get(username)
+        if lock is None: lock = self.locks[username] = asyncio.Lock()
+        return lock
+
+    async def run(self, fn, pool=None):
+        return await asyncio.get_running_loop().run_in_executor(pool or self.io, fn)
+
+    # --- Handlers: (client, body/query) -> (status, payload) ---
+    async def health(self, client, body):
+        return 200, {"ok": True, "accounts": len(self.clients), "requests": self.requests}
+
+    async def create_account(self, client, body):
+        u, p = str(body.get("username") or "").strip(), str(body.get("password") or "")
+        if not u or not p: raise HTTPError(400, "username and password are required")
+        async with self.create_lock:
+            msg = (await self.run(lambda: create_client(self.clients, u, p, amount(body, "amount", allow_zero=True)))).strip()
+        return (409 if msg in FAILURES else 201), {"ok": msg not in FAILURES, "message": msg}
+
+    async def login(self, client, body):
+        i = validate(self.clients, str(body.get("username") or ""), str(body.get("password") or ""))
+        if i is None: raise HTTPError(401, "Invalid Credentials")
+        c = self.clients[i]
+        async with self.lock(c.uname): await self.run(c.process_recurring)  # As the GUI does on login
+        token = secrets.token_hex(16); self.tokens[token] = c.uname
+        return 200, {"ok": True, "token": token, "username": c.uname}
+
+    async def account(self, client, query):
+        return 200, account_state(client)
+
+    async def operate(self, client, op):
+        async with self.lock(client.uname):
+            msg = (await self.run(op)).strip()
+        ok = msg not in FAILURES
+        return (200 if ok else 409), {"ok": ok, "message": msg, **account_state(client)}
+
+    async def transfer(self, client, body):
+        rx = self.clients.get(str(body.get("to") or ""))
+        if rx is None: raise HTTPError(404, "Recipient not found")
+        if rx is client: raise HTTPError(400, "Cannot transfer to yourself")
+        a = amount(body)
+        first, second = sorted([client.uname, rx.uname])
+        async with self.lock(first), self.lock(second):
+            msg = (await self.run(lambda: client.transfer(rx, a))).strip()
+        ok = msg not in FAILURES
+        return (200 if ok else 409), {"ok": ok, "message": msg, **account_state(client)}
+
+    async def transactions(self, client, query):
+        limit = min(int(query.get("limit", 50)), 500)
+        before = (query["before_ts"], int(query["before_id"])) if "before_ts" in query and "before_id" in query else None
+        rows = await self.run(lambda: get_store().page(client.uname, before=before, limit=limit))
+        return 200, {"ok": True, "rows": [dict(r) for r in rows]}
+
+    async def forecast(self, client, query):
+        def run():
+            text = predict_next_month_expense(client.uname).strip()
+            if not text.startswith("AI Forecast"): return text, None
+            return text, [round(float(p), 2) for p in forecast_user(client.uname)[0]]  # A cache hit by now
+        text, daily = await self.run(run, self.models)
+        return 200, {"ok": daily is not None, "message": text, "daily": daily}
+
+    async def report(self, client, query):
+        months = min(int(query.get("months", 6)), 60)
+        return 200, {"ok": True, "report": await self.run(lambda: generate_report(client.uname, months))}
+
+    # --- HTTP ---
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if len(parts) == 1:
+            handler = self.public.get((method, parts[0]))
+            if handler is None: raise HTTPError(404, "Not found")
+            return await handler(None, body if method == "POST" else query)
+        if len(parts) not in (2, 3) or parts[0] != "accounts": raise HTTPError(404, "Not found")
+        handler = self.routes.get((method, parts[2] if len(parts) == 3 else "account"))
+        if handler is None: raise HTTPError(404, "Not found")
+        user = self.tokens.get(headers.get("authorization", "").removeprefix("Bearer ").strip())
+        if user is None: raise HTTPError(401, "Log in first (POST /login) and send 'Authorization: Bearer <token>'")
+        if user != parts[1].lower(): raise HTTPError(403, "Token is for another account")
+        return await handler(self.clients.get(user), body if method == "POST" else query)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try: head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError): break
+                lines = head.decode("latin-1").split("\r\n")
+                try: method, target, version = lines[0].split(" ", 2)
+                except ValueError: break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line: k, v = line.split(":", 1); headers[k.strip().lower()] = v.strip()
+                length = int(headers.get("content-length") or 0)
+                keep = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                try:
+                    if length > MAX_BODY: keep = False; raise HTTPError(413, "Body too large")
+                    raw = await reader.readexactly(length) if length else b""
+                    body = json.loads(raw) if raw else {}
+                    if not isinstance(body, dict): raise HTTPError(400, "Body must be a JSON object")
+                    status, payload = await self.dispatch(method.upper(), target, headers, body)
+                except HTTPError as e: status, payload = e.status, {"ok": False, "error": str(e)}
+                except (ValueError, KeyError) as e: status, payload = 400, {"ok": False, "error": f"Bad request: {e}"}
+                except Exception as e: status, payload = 500, {"ok": False, "error": f"System Error: {e}"}
+                self.requests += 1
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} {STATUS.get(status, '')}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep: break
+        finally:
+            writer.close()
+
+    async def saver(self):
+        # Changed accounts are journaled in the background, off the request path. Each row is
+        # built under that account's lock, so a half-applied operation is never written.
+        while True:
+            await asyncio.sleep(SAVE_INTERVAL)
+            changed, rows = take_changed_clients(), []
+            for c in changed:
+                async with self.lock(c.uname): rows.append(client_row(c))
+            await self.run(lambda: save_client_rows(changed, rows))
+
+    async def serve(self, host=HOST, port=PORT):
+        self.create_lock = asyncio.Lock()
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        print(f" Serving {len(self.clients)} accounts on http://{host}:{port}")
+        saver = asyncio.create_task(self.saver())
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try: asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError): pass  # Windows: Ctrl+C still raises KeyboardInterrupt
+        try:
+            async with server: await stop.wait()
+        finally:
+            saver.cancel()
+            self.io.shutdown(); self.models.shutdown()  # Let running operations finish before the final save
+            save_all_clients(self.clients); get_store().flush()
+
+
+def amount(body, key="amount", allow_zero=False):
+    a = float(body.get(key, 0))
+    if a != a or a < 0 or (a == 0 and not allow_zero): raise HTTPError(400, f"'{key}' must be a positive number")
+    return a
+
+def account_state(c):
+    return {"username": c.uname, "balance": c.amount, "total_spent": c.total_spent, "budget": c.budget, "loans": c.loans}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless HTTP/JSON service for accounts and forecasts.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    try: asyncio.run(FinanceService().serve(args.host, args.port))
+    except KeyboardInterrupt: pass
+    print(f" Stopped after {time.perf_counter() - t0:.0f}s; accounts saved.")
@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from storage import CHUNK_ROWS, DB_FILE
+
+
+SNAPSHOT_DIR = "snapshot"
+CURRENT = "CURRENT"  # Name of the published version directory
+COLUMNS = [("user", np.int32), ("ts", np.int64), ("amount", np.float64), ("type", np.int32), ("category", np.int32)]
+NAT = np.iinfo(np.int64).min  # ts of rows whose timestamp doesn't parse
+DAY_US = 86400 * 10**6
+REBUILD_ROWS = 10000  # New ledger rows before refresh_snapshot() rebuilds
+STALE_BUILD_S = 600  # A .tmp build older than this (by its name) was cut short and is removed
+
+
+def _epoch_us(values):
+    """Canonical timestamp strings -> int64 microseconds since the epoch (NAT where unparseable)."""
+    try: return np.array(values, dtype="datetime64[us]").astype(np.int64)
+    except ValueError:
+        out = np.empty(len(values), dtype=np.int64)
+        for i, v in enumerate(values):
+            try: out[i] = np.datetime64(v, "us").astype(np.int64)
+            except ValueError: out[i] = NAT
+        return out
+
+def ledger_id(db_path=DB_FILE):
+    """The identity TransactionStore gives a new ledger, or None (no database yet)."""
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try: row = conn.execute("SELECT value FROM meta WHERE key = 'ledger_id'").fetchone()
+        finally: conn.close()
+    except sqlite3.Error: return None
+    return row[0] if row else None
+
+def _build_ms(name):
+    try: return int(name.split(".")[0].rsplit("-", 1)[1])
+    except (IndexError, ValueError): return None
+
+def build_snapshot(db_path=DB_FILE, root=SNAPSHOT_DIR, chunk_size=CHUNK_ROWS):
+    """
+    Writes the ledger (every row up to the current max id) as a columnar snapshot:
+    int32 dictionary codes for username/type/category, int64 epoch-microsecond
+    timestamps and float64 amounts, one .npy file per column, sorted by user then
+    time, plus an offsets table (user i owns rows offsets[i]:offsets[i+1]).
+    Reads through its own read-only connection, so the app can keep writing, and
+    publishes by renaming the finished directory and swapping CURRENT. meta.json
+    records the ledger's identity, so a snapshot of a replaced database is never used.
+    Returns the published directory.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'ledger_id'").fetchone()
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+        n = conn.execute("SELECT COUNT(*) FROM transactions WHERE id <= ?", (max_id,)).fetchone()[0]
+        started = int(time.time() * 1000); version = f"v{max_id}-{started}"
+        os.makedirs(root, exist_ok=True)
+        temp = os.path.join(root, version + ".tmp"); os.makedirs(temp)
+        cols = {name: np.lib.format.open_memmap(os.path.join(temp, name + ".npy"), mode="w+", dtype=dt, shape=(n,)) for name, dt in COLUMNS}
+        users, types, cats = {}, {}, {}
+        cur = conn.execute("""SELECT username, timestamp, amount, type, category FROM transactions
+            WHERE id <= ? ORDER BY username, timestamp, id""", (max_id,))
+        i = 0
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk: break
+            u, ts, a, t, c = zip(*chunk); j = i + len(chunk)
+            cols["user"][i:j] = [users.setdefault(x, len(users)) for x in u]
+            cols["ts"][i:j] = _epoch_us(ts)
+            cols["amount"][i:j] = a
+            cols["type"][i:j] = [types.setdefault(x, len(types)) for x in t]
+            cols["category"][i:j] = [cats.setdefault(x or "", len(cats)) for x in c]
+            i = j
+    finally: conn.close()
+    offsets = np.zeros(len(users) + 1, dtype=np.int64)
+    if n: np.cumsum(np.bincount(cols["user"], minlength=len(users)), out=offsets[1:])
+    for col in cols.values(): col.flush()
+    del cols
+    np.save(os.path.join(temp, "offsets.npy"), offsets)
+    with open(os.path.join(temp, "meta.json"), "w") as f:
+        json.dump({"ledger_id": row[0] if row else None, "max_id": max_id, "rows": n, "built_at": str(datetime.now()),
+                   "users": list(users), "types": list(types), "categories": list(cats)}, f)
+    final = os.path.join(root, version)
+    os.replace(temp, final)
+    with open(os.path.join(root, CURRENT + ".tmp"), "w") as f: f.write(version)
+    os.replace(os.path.join(root, CURRENT + ".tmp"), os.path.join(root, CURRENT))
+    # Older versions go; processes still mapping them keep their pages (POSIX), elsewhere they're retried next time.
+    # Builds cut short (e.g. the app exited mid-build) leave .tmp directories, removed once clearly abandoned.
+    for name in os.listdir(root):
+        if name in (version, CURRENT, CURRENT + ".tmp"): continue
+        if name.endswith(".tmp") and (_build_ms(name) or started) > started - STALE_BUILD_S * 1000: continue
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return final
+
+
+class Snapshot:
+    """
+    Read-only view of a published snapshot. Columns are np.load(mmap_mode='r')
+    maps, so every process opening the same snapshot shares one copy in the OS
+    page cache, and user_rows() hands out slices of them without copying.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f: meta = json.load(f)
+        self.ledger_id = meta.get("ledger_id"); self.max_id = meta["max_id"]; self.rows = meta["rows"]
+        self.users = meta["users"]; self.types = meta["types"]; self.categories = meta["categories"]
+        self.user_index = {u: i for i, u in enumerate(self.users)}
+        self.type_index = {t: i for i, t in enumerate(self.types)}
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+        self.cols = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") if self.rows else np.empty(0, dtype=dt)
+                     for name, dt in COLUMNS}
+
+    def __contains__(self, username): return username.lower() in self.user_index
+    def __len__(self): return self.rows
+
+    def user_rows(self, username):
+        """{column: view} for one user's rows, in time order (empty views for unknown users)."""
+        i = self.user_index.get(username.lower())
+        lo, hi = (self.offsets[i], self.offsets[i + 1]) if i is not None else (0, 0)
+        return {name: col[lo:hi] for name, col in self.cols.items()}
+
+    def type_codes(self, types):
+        return np.array([self.type_index[t] for t in types if t in self.type_index], dtype=np.int32)
+
+    def daily_totals(self, username, types):
+        """(first day as epoch days, per-day sums with empty days 0) of the user's rows of these types, or None."""
+        r = self.user_rows(username)
+        keep = np.isin(r["type"], self.type_codes(types)) & (r["ts"] != NAT)
+        if not keep.any(): return None
+        days = r["ts"][keep] // DAY_US
+        first = int(days[0])  # rows are time-ordered
+        return first, np.bincount(days - first, weights=r["amount"][keep])
+
+    def daily_series(self, username, types):
+        """daily_totals() as the pandas Series build_daily_series() returns."""
+        import pandas as pd
+        totals = self.daily_totals(username, types)
+        if totals is None: return None
+        first, values = totals
+        index = pd.date_range(pd.Timestamp(first, unit="D"), periods=len(values), freq="D", name="timestamp")
+        return pd.Series(values, index=index, name="amount")
+
+    def daily_frame(self, types):
+        """(username, day, amount) per-day sums for every user, from one vectorized pass over the columns."""
+        import pandas as pd
+        keep = np.isin(self.cols["type"], self.type_codes(types)) & (self.cols["ts"] != NAT)
+        user = self.cols["user"][keep]; day = self.cols["ts"][keep] // DAY_US
+        # Rows are sorted by user then time, so each (user, day) is one contiguous run
+        start = np.flatnonzero(np.r_[True, (user[1:] != user[:-1]) | (day[1:] != day[:-1])]) if len(user) else np.empty(0, dtype=np.int64)
+        return pd.DataFrame({"username": np.array(self.users, dtype=object)[user[start]], "day": pd.to_datetime(day[start], unit="D"),
+                             "amount": np.add.reduceat(self.cols["amount"][keep], start) if len(start) else np.empty(0)})
+
+
+_snapshot = None
+_snapshot_key = None
+_snapshot_lock = threading.Lock()
+
+def get_snapshot(root=SNAPSHOT_DIR, db_path=DB_FILE):
+    """The current published snapshot of db_path's ledger (reopened when a newer one is published), or None."""
+    global _snapshot, _snapshot_key
+    try:
+        with open(os.path.join(root, CURRENT)) as f: version = f.read().strip()
+    except OSError: return None
+    key = (os.path.abspath(root), version)
+    with _snapshot_lock:
+        if key != _snapshot_key:
+            try: _snapshot = Snapshot(os.path.join(root, version)); _snapshot_key = key
+            except (OSError, ValueError, KeyError): return None
+        snap = _snapshot
+    # Built from another ledger (the database was deleted or replaced): its rows and max_id mean nothing here
+    if snap.ledger_id is None or snap.ledger_id != ledger_id(db_path): return None
+    return snap
+
+def pending_rows(db_path=DB_FILE, root=SNAPSHOT_DIR):
+    """Ledger rows newer than the current snapshot (all of them without one)."""
+    snap = get_snapshot(root, db_path)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try: return conn.execute("SELECT COUNT(*) FROM transactions WHERE id > ?", (snap.max_id if snap else 0,)).fetchone()[0]
+    finally: conn.close()
+
+def refresh_snapshot(db_path=DB_FILE, root=SNAPSHOT_DIR, min_new_rows=REBUILD_ROWS):
+    """Rebuilds the snapshot once min_new_rows rows have been added since the last one. Returns the snapshot or None."""
+    if not os.path.exists(db_path): return None
+    if get_snapshot(root, db_path) is None or pending_rows(db_path, root) >= min_new_rows: build_snapshot(db_path, root)
+    return get_snapshot(root, db_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the memory-mapped columnar ledger snapshot.")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--info", action="store_true", help="Describe the current snapshot instead of building one")
+    args = parser.parse_args()
+    if not args.info:
+        t0 = time.perf_counter(); build_snapshot(args.db, args.dir)
+        print(f" Snapshot built in {time.perf_counter() - t0:.2f}s")
+    snap = get_snapshot(args.dir, args.db)
+    if snap is None: raise SystemExit(" No snapshot yet.")
+    size = sum(os.path.getsize(os.path.join(snap.path, f)) for f in os.listdir(snap.path))
+    print(f" {snap.path}: {snap.rows:,} rows, {len(snap.users):,} users, {len(snap.types)} types, {len(snap.categories):,} categories, "
+          f"{size / 2**20:.1f} MiB, up to id {snap.max_id:,} ({pending_rows(args.db, args.dir):,} newer rows in the ledger)")
@@ -0,0 +1,432 @@
+import argparse
+import atexit
+import csv
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+
+DB_FILE = "transactions.db"
+LEGACY_CSV = "transactions.csv"
+COLUMNS = ["username", "timestamp", "amount", "type", "category"]
+CHUNK_ROWS = 50000
+DURABILITY_MODES = ("flush", "group", "fsync")
+DURABILITY = "group"
+FLUSH_ROWS = 256  # group commit: flush once this many rows are buffered...
+FLUSH_INTERVAL = 1.0  # ...or this many seconds after the first buffered row
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"  # Canonical on-disk encoding: fixed width, so text order is time order
+
+
+def is_canonical(ts):
+    return len(ts) == 26 and ts[10] == " " and ts[19] == "."
+
+def format_timestamp(ts):
+    """
+    Canonical string for a datetime, pandas Timestamp or legacy string; None if unparseable.
+    Legacy strings are ISO (str(datetime.now()), "%Y-%m-%d 12:00:00"); anything else is
+    read day-first, as the old readers did.
+    """
+    if isinstance(ts, str):
+        if is_canonical(ts): return ts
+        try: ts = datetime.fromisoformat(ts.strip())
+        except ValueError:
+            import pandas as pd
+            ts = pd.to_datetime(ts, dayfirst=True, errors="coerce")
+            if ts is None or ts is pd.NaT: return None
+    return ts.strftime(TIMESTAMP_FORMAT)
+
+def _ledger_rows(rows):
+    return [(u.lower(), format_timestamp(ts) or str(ts), float(a), t, c) for u, ts, a, t, c in rows]
+
+
+class TransactionStore:
+    """
+    SQLite ledger with a (username, timestamp) index.
+    Reads only touch the rows of the requested user, so cost follows the
+    size of that user's history instead of the whole file.
+    """
+    def __init__(self, path=DB_FILE, durability=DURABILITY, flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.buffer = []; self.timer = None
+        self.flush_rows = flush_rows; self.flush_interval = flush_interval
+        self.set_durability(durability)
+        with self.lock, self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, timestamp TEXT NOT NULL,
+                amount REAL NOT NULL, type TEXT NOT NULL, category TEXT)""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_user_time ON transactions (username, timestamp, id)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # Materialized aggregates, kept in step with every flush
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS monthly_totals (
+                username TEXT NOT NULL, month TEXT NOT NULL, type TEXT NOT NULL, total REAL NOT NULL, n INTEGER NOT NULL,
+                PRIMARY KEY (username, month, type))""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS category_totals (
+                username TEXT NOT NULL, type TEXT NOT NULL, category TEXT NOT NULL, total REAL NOT NULL, n INTEGER NOT NULL,
+                PRIMARY KEY (username, type, category))""")
+        if self.get_meta("ledger_id") is None: self.set_meta("ledger_id", uuid.uuid4().hex)  # Ties snapshots to this database
+        if self.get_meta("aggregates") is None: self.rebuild_aggregates()
+        if self.get_meta("timestamps") != TIMESTAMP_FORMAT: self.normalize_timestamps()
+
+    # --- Meta ---
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # --- Writes ---
+    def set_durability(self, mode):
+        """
+        flush : commit every write (WAL, synchronous=NORMAL; survives an app crash)
+        group : buffer writes and commit them together every flush_rows rows or
+                flush_interval seconds, and on flush()/close()
+        fsync : commit every write and fsync it (synchronous=FULL; survives power loss)
+        """
+        if mode not in DURABILITY_MODES: raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+        with self.lock:
+            self.flush()
+            self.durability = mode
+            self.conn.execute(f"PRAGMA synchronous={'FULL' if mode == 'fsync' else 'NORMAL'}")
+
+    def append(self, username, timestamp, amount, t, category):
+        self.append_many([(username, timestamp, amount, t, category)])
+
+    def append_many(self, rows):
+        """Queues rows as one unit: they always reach the database in the same commit."""
+        rows = _ledger_rows(rows)
+        with self.lock:
+            self.buffer.extend(rows)
+            if self.durability != "group" or len(self.buffer) >= self.flush_rows: self.flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.flush_interval, self.flush); self.timer.daemon = True; self.timer.start()
+
+    def flush(self, meta=None):
+        """Commits the buffered rows (and any meta {key: value}) in one transaction."""
+        with self.lock:
+            if self.timer is not None: self.timer.cancel(); self.timer = None
+            if not self.buffer and not meta: return
+            rows, self.buffer = self.buffer, []
+            monthly, categories = {}, {}
+            for u, ts, a, t, c in rows:
+                m = monthly.setdefault((u, ts[:7], t), [0.0, 0]); m[0] += a; m[1] += 1
+                k = categories.setdefault((u, t, c or ""), [0.0, 0]); k[0] += a; k[1] += 1
+            with self.conn:
+                self.conn.executemany("INSERT INTO transactions (username, timestamp, amount, type, category) VALUES (?, ?, ?, ?, ?)", rows)
+                self.conn.executemany("""INSERT INTO monthly_totals VALUES (?, ?, ?, ?, ?) ON CONFLICT (username, month, type)
+                    DO UPDATE SET total = total + excluded.total, n = n + excluded.n""", [k + tuple(v) for k, v in monthly.items()])
+                self.conn.executemany("""INSERT INTO category_totals VALUES (?, ?, ?, ?, ?) ON CONFLICT (username, type, category)
+                    DO UPDATE SET total = total + excluded.total, n = n + excluded.n""", [k + tuple(v) for k, v in categories.items()])
+                if meta: self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+
+    def rebuild_aggregates(self):
+        """Regenerates monthly_totals and category_totals from the raw ledger."""
+        with self.lock:
+            self.flush()
+            with self.conn:
+                self.conn.execute("DELETE FROM monthly_totals"); self.conn.execute("DELETE FROM category_totals")
+                self.conn.execute("""INSERT INTO monthly_totals SELECT username, substr(timestamp, 1, 7), type, SUM(amount), COUNT(*)
+                    FROM transactions GROUP BY username, substr(timestamp, 1, 7), type""")
+                self.conn.execute("""INSERT INTO category_totals SELECT username, type, COALESCE(category, ''), SUM(amount), COUNT(*)
+                    FROM transactions GROUP BY username, type, COALESCE(category, '')""")
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('aggregates', ?)", (str(datetime.now()),))
+
+    # --- Reads ---
+    def _where(self, username, start, end, types, after_id=None):
+        sql, args = ["username = ?"], [username.lower()]
+        if after_id: sql.append("id > ?"); args.append(int(after_id))
+        if start is not None: sql.append("timestamp >= ?"); args.append(str(start))
+        if end is not None: sql.append("timestamp < ?"); args.append(str(end))
+        if types: sql.append(f"type IN ({','.join('?' * len(types))})"); args.extend(types)
+        return " AND ".join(sql), args
+
+    def rows(self, username, start=None, end=None, types=None, limit=None, offset=0, newest_first=False, after_id=None):
+        """Rows for one user in [start, end) (and with id > after_id), time-ordered through the index."""
+        where, args = self._where(username, start, end, types, after_id)
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT id, {', '.join(COLUMNS)} FROM transactions WHERE {where} ORDER BY timestamp {order}, id {order}"
+        if limit is not None: sql += " LIMIT ? OFFSET ?"; args += [int(limit), int(offset)]
+        with self.lock:
+            self.flush()
+            return self.conn.execute(sql, args).fetchall()
+
+    def page(self, username, before=None, after=None, limit=50, types=None):
+        """
+        Keyset page of a user's rows, newest first.
+        before/after are the (timestamp, id) of an edge row already on screen, so
+        paging costs one index seek however deep into the history it is.
+        """
+        where, args = self._where(username, None, None, types)
+        cursor = before or after
+        if cursor: where += f" AND (timestamp, id) {'<' if before else '>'} (?, ?)"; args += [str(cursor[0]), int(cursor[1])]
+        order = "ASC" if after and not before else "DESC"
+        sql = f"SELECT id, {', '.join(COLUMNS)} FROM transactions WHERE {where} ORDER BY timestamp {order}, id {order} LIMIT ?"
+        with self.lock:
+            self.flush()
+            rows = self.conn.execute(sql, args + [int(limit)]).fetchall()
+        return rows[::-1] if order == "ASC" else rows
+
+    def frame(self, username, start=None, end=None, types=None, after_id=None):
+        import pandas as pd
+        rows = self.rows(username, start, end, types, after_id=after_id)
+        return pd.DataFrame([tuple(r)[1:] for r in rows], columns=COLUMNS)
+
+    def scan(self, types=None, chunk_size=CHUNK_ROWS, after_id=0):
+        """Single pass over every user's rows (id > after_id), yielded in chunks of (username, timestamp, amount, type, category)."""
+        sql, args = f"SELECT {', '.join(COLUMNS)} FROM transactions WHERE id > ?", [int(after_id)]
+        if types: sql += f" AND type IN ({','.join('?' * len(types))})"; args += list(types)
+        with self.lock: self.flush(); cur = self.conn.execute(sql, args)
+        while True:
+            with self.lock: chunk = cur.fetchmany(chunk_size)
+            if not chunk: break
+            yield [tuple(r) for r in chunk]
+
+    def version(self, username):
+        """Marker that changes whenever a user's history does (the ledger is append-only, so the row count)."""
+        return self.count(username)
+
+    def iter_rows(self, username, start=None, end=None, types=None, chunk_size=CHUNK_ROWS):
+        """A user's rows in time order, fetched chunk by chunk with a keyset cursor (bounded memory)."""
+        where, args = self._where(username, start, end, types)
+        sql = f"SELECT id, {', '.join(COLUMNS)} FROM transactions WHERE {where} AND (timestamp, id) > (?, ?) ORDER BY timestamp, id LIMIT ?"
+        cursor = ("", 0)
+        while True:
+            with self.lock:
+                self.flush()
+                chunk = self.conn.execute(sql, args + [cursor[0], cursor[1], chunk_size]).fetchall()
+            if not chunk: break
+            yield chunk
+            cursor = (chunk[-1]['timestamp'], chunk[-1]['id'])
+
+    def count(self, username=None, start=None, end=None, types=None):
+        with self.lock:
+            self.flush()
+            if username is None: return self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+            where, args = self._where(username, start, end, types)
+            return self.conn.execute(f"SELECT COUNT(*) FROM transactions WHERE {where}", args).fetchone()[0]
+
+    def monthly_totals(self, username, types=None):
+        """(month 'YYYY-MM', type, total, n) rows for a user, oldest month first."""
+        sql, args = "SELECT month, type, total, n FROM monthly_totals WHERE username = ?", [username.lower()]
+        if types: sql += f" AND type IN ({','.join('?' * len(types))})"; args += list(types)
+        with self.lock:
+            self.flush()
+            return self.conn.execute(sql + " ORDER BY month, type", args).fetchall()
+
+    def category_totals(self, username, types=None, merge_types=False):
+        """(type, category, total, n) rows for a user, largest total first; merge_types sums each category across types (no type column)."""
+        cols = "category, SUM(total) AS total, SUM(n) AS n" if merge_types else "type, category, total, n"
+        sql, args = f"SELECT {cols} FROM category_totals WHERE username = ?", [username.lower()]
+        if types: sql += f" AND type IN ({','.join('?' * len(types))})"; args += list(types)
+        if merge_types: sql += " GROUP BY category"
+        with self.lock:
+            self.flush()
+            return self.conn.execute(sql + " ORDER BY total DESC", args).fetchall()
+
+    # --- Migration ---
+    def migrate_csv(self, csv_path=LEGACY_CSV):
+        """
+        One-shot import of the legacy transactions.csv. Returns rows imported (0 if already done).
+        Each chunk commits together with the CSV line it reached, so an import cut short
+        resumes after that line on the next start instead of importing the rows twice.
+        """
+        if self.get_meta("migrated_csv") or not os.path.exists(csv_path): return 0
+        done = int(self.get_meta("migrated_csv_line", 0)); total = line = 0
+        with open(csv_path, "r", newline='') as f:
+            reader = csv.reader(f); next(reader, None)
+            chunk = []
+            for line, row in enumerate(reader, 1):
+                if line <= done or len(row) < 5: continue
+                try: chunk.append((row[0], row[1], float(row[2]), row[3], row[4]))
+                except ValueError: continue
+                if len(chunk) >= CHUNK_ROWS: self._import(chunk, {"migrated_csv_line": line}); total += len(chunk); chunk = []
+        self._import(chunk, {"migrated_csv_line": max(line, done), "migrated_csv": datetime.now()}); total += len(chunk)
+        return total
+
+    def _import(self, rows, meta):
+        with self.lock:
+            self.flush(); self.buffer.extend(_ledger_rows(rows)); self.flush(meta)
+
+    def normalize_timestamps(self, chunk_size=CHUNK_ROWS):
+        """
+        One-time rewrite of every non-canonical timestamp to TIMESTAMP_FORMAT (then the
+        aggregates are rebuilt). Returns (rows rewritten, rows left as they were because they don't parse).
+        """
+        with self.lock:
+            self.flush()
+            changed = bad = last = 0
+            while True:
+                rows = self.conn.execute("""SELECT id, timestamp FROM transactions WHERE id > ? AND NOT
+                    (length(timestamp) = 26 AND substr(timestamp, 11, 1) = ' ' AND substr(timestamp, 20, 1) = '.') ORDER BY id LIMIT ?""", (last, chunk_size)).fetchall()
+                if not rows: break
+                last = rows[-1][0]
+                updates = [(format_timestamp(ts), i) for i, ts in rows]
+                good = [u for u in updates if u[0]]; bad += len(updates) - len(good)
+                with self.conn: self.conn.executemany("UPDATE transactions SET timestamp = ? WHERE id = ?", good)
+                changed += len(good)
+            if changed: self.rebuild_aggregates()
+            self.set_meta("timestamps", TIMESTAMP_FORMAT)
+            return changed, bad
+
+    def close(self):
+        with self.lock: self.flush(); self.conn.close()
+
+
+def normalize_csv(path=LEGACY_CSV, out_path=None, chunk_rows=CHUNK_ROWS):
+    """
+    Rewrites a transactions.csv with canonical timestamps (column 2) in one streaming
+    pass, in place unless out_path is given. Unparseable timestamps are kept as they are.
+    Returns (rows, rows rewritten, rows unparseable).
+    """
+    out_path = out_path or path; temp = out_path + ".tmp"
+    rows = changed = bad = 0
+    with open(path, "r", newline='') as src, open(temp, "w", newline='') as dst:
+        reader = csv.reader(src); writer = csv.writer(dst)
+        header = next(reader, None)
+        if header is not None: writer.writerow(header)
+        chunk = []
+        for row in reader:
+            rows += 1
+            if len(row) > 1:
+                ts = format_timestamp(row[1])
+                if ts is None: bad += 1
+                elif ts != row[1]: row[1] = ts; changed += 1
+            chunk.append(row)
+            if len(chunk) >= chunk_rows: writer.writerows(chunk); chunk = []
+        writer.writerows(chunk)
+    os.replace(temp, out_path)
+    return rows, changed, bad
+
+
+class AccountJournal:
+    """
+    Incremental persistence for users.txt.
+    Changed accounts are appended to users.journal as one batch (a begin
+    line, full records, then a commit line with the record count), and the batch is flushed and fsynced
+    before returning. A batch torn by a crash has no commit line and is
+    ignored on load, so each save is all-or-nothing, as the old atomic
+    replace was. Once the journal grows past compact_every records it is
+    rotated and merged back into users.txt (tmp file + os.replace) on a
+    background thread; a merge cut short by an exit or crash is finished on
+    the next load.
+    """
+    def __init__(self, base="users.txt", header=None, compact_every=5000):
+        self.base = base; self.header = header
+        self.path = os.path.splitext(base)[0] + ".journal"
+        self.compacting = self.path + ".compacting"
+        self.compact_every = compact_every
+        self.lock = threading.Lock()
+        self.records = None  # records in the live journal, counted on first write
+        self.worker = None
+
+    def _read_base(self, rows):
+        if not os.path.exists(self.base): return
+        with open(self.base, "r", newline='') as f:
+            reader = csv.reader(f); next(reader, None)
+            for row in reader:
+                if row: rows[row[0].lower()] = row
+
+    def _replay(self, path, rows):
+        """Applies committed batches from a journal file; returns the number of records seen."""
+        if not os.path.exists(path): return 0
+        seen, batch = 0, []
+        with open(path, "r", newline='') as f:
+            for row in csv.reader(f):
+                if not row: continue
+                if row[0] == "B": batch = []
+                elif row[0] == "R" and len(row) > 2: batch.append(row[1:]); seen += 1
+                elif row[0] == "C" and len(row) == 2 and row[1] == str(len(batch)):
+                    for r in batch: rows[r[0].lower()] = r
+                    batch = []
+                else: batch = []  # torn or corrupt batch
+        return seen
+
+    def load_rows(self):
+        """Latest record for every account: users.txt, then any journal being compacted, then the live journal."""
+        with self.lock:
+            if not (self.worker and self.worker.is_alive()): self.compact_pending()  # left over from an interrupted merge
+            rows = {}
+            self._read_base(rows)
+            self._replay(self.compacting, rows)
+            self.records = self._replay(self.path, rows)
+            return list(rows.values())
+
+    def write(self, rows):
+        """Appends one batch of changed records atomically."""
+        if not rows: return
+        with self.lock:
+            if self.records is None: self.records = self._replay(self.path, {})
+            with open(self.path, "a+", newline='') as f:
+                if f.tell():  # a torn tail from a crash must not swallow this batch's first line
+                    f.seek(f.tell() - 1); torn = f.read(1) != "\n"; f.seek(0, os.SEEK_END)
+                    if torn: f.write("\n")
+                w = csv.writer(f); w.writerow(["B"])
+                for r in rows: w.writerow(["R"] + list(r))
+                w.writerow(["C", len(rows)])
+                f.flush(); os.fsync(f.fileno())
+            self.records += len(rows)
+            if self.records >= self.compact_every and not (self.worker and self.worker.is_alive()):
+                # A leftover rotated journal is merged first; the live one rotates on a later write
+                if not os.path.exists(self.compacting): os.replace(self.path, self.compacting); self.records = 0
+                # Not a daemon: the interpreter waits for the merge at exit instead of cutting it short
+                self.worker = threading.Thread(target=self.compact_pending); self.worker.start()
+
+    def compact_pending(self):
+        """Merges a rotated journal into users.txt. Safe to re-run after a crash (records are full state)."""
+        if not os.path.exists(self.compacting): return
+        rows = {}
+        self._read_base(rows); self._replay(self.compacting, rows)
+        temp = self.base + ".tmp"
+        with open(temp, "w", newline='') as f:
+            w = csv.writer(f)
+            if self.header: w.writerow(self.header)
+            w.writerows(rows.values())
+            f.flush(); os.fsync(f.fileno())
+        os.replace(temp, self.base)
+        os.remove(self.compacting)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store(path=DB_FILE):
+    """Process-wide store, opened (and migrated from CSV) on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TransactionStore(path)
+            _store.migrate_csv()
+            atexit.register(_store.flush)
+        return _store
+
+def close_store():
+    """Flushes and closes the process-wide store; the next get_store() reopens it (e.g. after a chdir)."""
+    global _store
+    with _store_lock:
+        if _store is not None: _store.close(); _store = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance for the transaction store.")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--rebuild-aggregates", action="store_true", help="Regenerate the monthly/category totals from the raw ledger")
+    parser.add_argument("--normalize-csv", nargs="+", metavar="CSV", help="Rewrite these transactions.csv files with canonical timestamps and exit")
+    args = parser.parse_args()
+    if args.normalize_csv:
+        for path in args.normalize_csv:
+            rows, changed, bad = normalize_csv(path)
+            print(f" {path}: {rows:,} rows, {changed:,} timestamps rewritten" + (f", {bad:,} unparseable (left as is)" if bad else ""))
+        raise SystemExit(0)
+    store = TransactionStore(args.db)  # Opening it also normalizes old timestamps, once
+    if args.rebuild_aggregates:
+        store.rebuild_aggregates()
+        print(f" Aggregates rebuilt from {store.count():,} transactions.")
+    store.close()
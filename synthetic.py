@@ -0,0 +1,135 @@
+import argparse
+import csv
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from storage import COLUMNS, get_store
+
+
+EXPENSE_CATEGORIES = ["Food", "Groceries", "Fuel", "Bills", "Shopping", "Health", "Entertainment", "Education"]
+EXPENSE_WEIGHTS = [0.26, 0.2, 0.14, 0.1, 0.12, 0.06, 0.08, 0.04]
+TYPES = np.array(["Expense", "Income", "Recurring Expense", "Transfer Out", "Transfer In", "Loan Received", "Loan Repayment"])
+CHUNK_USERS = 2000  # Users generated (and written) per chunk
+TRANSFER_RATE = 0.02  # Chance of a transfer per user-day
+LOAN_RATE = 0.1  # Share of users who take one loan
+
+
+def _strings(values):
+    return np.array(values, dtype=object)
+
+def generate_chunk(rng, usernames, days, start):
+    """
+    Vectorized rows for one block of users over `days` days from `start` (a date).
+    Per user: a spending scale, 0-n daily expenses across weighted categories,
+    a monthly salary, a fixed monthly rent (Recurring Expense), occasional
+    transfers to other users in the block and, for some, a loan and its repayment.
+    Returns (username, timestamp, amount, type, category) rows sorted by user and time.
+    """
+    k = len(usernames); names = _strings(usernames)
+    scale = rng.lognormal(6.8, 0.5, k)  # Typical single expense (PKR)
+    base = np.datetime64(start, "D")
+    months = np.arange(base.astype("datetime64[M]"), (base + days).astype("datetime64[M]") + 1)
+    month_days = (months.astype("datetime64[D]") - base).astype(np.int64)
+    month_days = month_days[(month_days >= 0) & (month_days < days)]
+
+    # Daily expenses: Poisson count per user-day, lognormal amounts, weighted categories
+    counts = rng.poisson(rng.uniform(0.5, 2.0, k)[:, None], (k, days)).ravel()
+    cell = np.repeat(np.arange(k * days), counts)
+    u = [cell // days]; d = [cell % days]; n = len(cell)
+    secs = [rng.integers(8 * 3600, 23 * 3600, n)]
+    amt = [np.round(scale[u[0]] * rng.lognormal(0, 0.6, n), 2)]
+    typ = [np.zeros(n, dtype=np.int8)]
+    cats = _strings(EXPENSE_CATEGORIES)
+    cat = [cats[rng.choice(len(cats), n, p=EXPENSE_WEIGHTS)]]
+
+    # Salary on the 1st and rent on a per-user day of every month
+    if len(month_days):
+        salary = np.round(scale * 60 * rng.uniform(1.1, 1.6, k), -2); rent = np.round(scale * 15, -2); rent_day = rng.integers(0, 28, k)
+        mu = np.repeat(np.arange(k), len(month_days)); md = np.tile(month_days, k)
+        u += [mu, mu]; d += [md, np.minimum(md + rent_day[mu], days - 1)]
+        secs += [np.full(len(mu), 9 * 3600), np.full(len(mu), 10 * 3600)]
+        amt += [salary[mu], rent[mu]]
+        typ += [np.full(len(mu), 1, dtype=np.int8), np.full(len(mu), 2, dtype=np.int8)]
+        cat += [np.full(len(mu), "Salary", dtype=object), np.full(len(mu), "Rent", dtype=object)]
+
+    # Transfers between users of the block: both legs share a timestamp
+    if k > 1:
+        nt = rng.binomial(k * days, TRANSFER_RATE)
+        tu = rng.integers(0, k, nt); tv = (tu + rng.integers(1, k, nt)) % k; td = rng.integers(0, days, nt)
+        ts = rng.integers(8 * 3600, 23 * 3600, nt); ta = np.round(scale[tu] * rng.uniform(1, 5, nt), -1)
+        u += [tu, tv]; d += [td, td]; secs += [ts, ts]; amt += [ta, ta]
+        typ += [np.full(nt, 3, dtype=np.int8), np.full(nt, 4, dtype=np.int8)]
+        cat += [names[tv], names[tu]]
+
+    # One loan for some users, repaid within 30-120 days
+    lu = np.flatnonzero(rng.random(k) < LOAN_RATE)
+    if len(lu) and days > 1:
+        ld = rng.integers(0, days, len(lu)); rd = np.minimum(ld + rng.integers(30, 121, len(lu)), days - 1)
+        la = np.round(scale[lu] * rng.uniform(20, 80, len(lu)), -3)
+        u += [lu, lu]; d += [ld, rd]; secs += [np.full(len(lu), 11 * 3600)] * 2; amt += [la, la]
+        typ += [np.full(len(lu), 5, dtype=np.int8), np.full(len(lu), 6, dtype=np.int8)]
+        cat += [np.full(len(lu), "Bank", dtype=object)] * 2
+
+    u = np.concatenate(u); d = np.concatenate(d); secs = np.concatenate(secs)
+    stamp = base.astype("datetime64[s]") + d * 86400 + secs
+    order = np.lexsort((stamp, u))  # User then time, like the ledger index
+    ts_str = np.char.replace(np.datetime_as_string(stamp[order], unit="us"), "T", " ")  # storage.TIMESTAMP_FORMAT
+    return list(zip(names[u[order]].tolist(), ts_str.tolist(), np.concatenate(amt)[order].tolist(),
+                    TYPES[np.concatenate(typ)[order]].tolist(), np.concatenate(cat)[order].tolist()))
+
+def usernames(n_users, prefix="user"):
+    width = max(5, len(str(n_users - 1)))
+    return [f"{prefix}{i:0{width}d}" for i in range(n_users)]
+
+def generate(n_users, days, seed=None, start=None, prefix="user", chunk_users=CHUNK_USERS, names=None):
+    """Yields row chunks for n_users (or the given names) x days, chunk_users users at a time. Same seed, same data."""
+    rng = np.random.default_rng(seed)
+    names = names or usernames(n_users, prefix)
+    start = start or (datetime.now() - timedelta(days=days)).date()
+    for i in range(0, len(names), chunk_users):
+        yield generate_chunk(rng, names[i:i + chunk_users], days, start)
+
+def write_store(chunks, store=None):
+    """Appends each chunk to the ledger as one transaction. Returns rows written."""
+    store = store or get_store(); n = 0
+    for rows in chunks: store.append_many(rows); store.flush(); n += len(rows)
+    return n
+
+def write_csv(chunks, path):
+    """Writes chunks in the legacy transactions.csv layout. Returns rows written."""
+    n = 0
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f); w.writerow(COLUMNS)
+        for rows in chunks: w.writerows(rows); n += len(rows)
+    return n
+
+def create_accounts(names, password="pass", balance=100000):
+    """Matching users.txt accounts for the generated usernames (existing ones are left alone)."""
+    from logic import StandardAccount, load_all_clients, save_all_clients
+    clients = load_all_clients()
+    for u in names:
+        if u not in clients: clients.append(StandardAccount(u, password, balance))
+    save_all_clients(clients)
+    return clients
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic workload for capacity testing.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prefix", default="user")
+    parser.add_argument("--chunk-users", type=int, default=CHUNK_USERS)
+    parser.add_argument("--csv", help="Write to this CSV instead of transactions.db")
+    parser.add_argument("--accounts", action="store_true", help="Also create matching accounts in users.txt")
+    args = parser.parse_args()
+
+    names = usernames(args.users, args.prefix)
+    t0 = time.perf_counter()
+    chunks = generate(args.users, args.days, args.seed, names=names, chunk_users=args.chunk_users)
+    n = write_csv(chunks, args.csv) if args.csv else write_store(chunks)
+    elapsed = time.perf_counter() - t0
+    print(f" Generated {n:,} rows for {args.users:,} users x {args.days} days in {elapsed:.2f}s ({n / max(elapsed, 1e-9):,.0f} rows/s) -> {args.csv or 'transactions.db'}")
+    if args.accounts: create_accounts(names); print(f" Created accounts for {len(names):,} users in users.txt")
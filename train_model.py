@@ -1,6 +1,11 @@
+import argparse
 import pandas as pd
 import numpy as np
 import os
+import time
+import tracemalloc
+import tensorflow as tf
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import MinMaxScaler
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
@@ -9,65 +14,181 @@ from tensorflow.keras.layers import LSTM, Dense, Dropout
 KAGGLE_FILE = r"Personal_Finance_Dataset.csv"
 MODEL_FILE = "finance_brain.keras"
 LOOK_BACK = 30  # Days of history the AI needs to see
+EPOCHS = 20
+BATCH_SIZE = 32
 
-def train_network():
-    if not os.path.exists(KAGGLE_FILE):
-        print(f" Error: '{KAGGLE_FILE}' not found. Please upload it.")
-        return
 
-    print("Loading Kaggle Dataset...")
-    df = pd.read_csv(KAGGLE_FILE)
-
-    
-    
-    expense_df = df[df['Type'].astype(str).str.lower() == 'expense'].copy()
-    
-    
-    expense_df['Date'] = pd.to_datetime(expense_df['Date'], dayfirst=False, format='mixed', errors='coerce')
-    expense_df = expense_df.dropna(subset=['Date'])
-    
-    
-    daily_data = expense_df.set_index('Date').resample('D')['Amount'].sum().fillna(0)
-    
-    print(f"✅ Data Processed. Found {len(daily_data)} days of history.")
-
-    
-    
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(daily_data.values.reshape(-1, 1))
-
-    
-    X, y = [], []
-    for i in range(len(scaled_data) - LOOK_BACK):
-        X.append(scaled_data[i : i + LOOK_BACK])
-        y.append(scaled_data[i + LOOK_BACK])
-    
-    X, y = np.array(X), np.array(y)
+INGEST_COLUMNS = ['Date', 'Type', 'Amount']
+DATE_FORMAT = "%Y-%m-%d"
+CHUNK_ROWS = 100000
+
+
+def parse_dates(values):
+    """Fast fixed-format parse; only rows that don't match fall back to format='mixed'."""
+    dates = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+    bad = dates.isna() & values.notna()
+    if bad.any(): dates[bad] = pd.to_datetime(values[bad], dayfirst=False, format='mixed', errors='coerce')
+    return dates
+
+def daily_expenses(expense_df):
+    expense_df = expense_df[expense_df['Type'].astype(str).str.lower() == 'expense']
+    dates = parse_dates(expense_df['Date'])
+    return expense_df['Amount'].groupby(dates.dt.floor('D')).sum()
+
+def load_daily_series(path, chunksize=CHUNK_ROWS, legacy=False):
+    """
+    Daily expense totals for one CSV.
+    Reads only the Date/Type/Amount columns, chunk by chunk, and reduces each
+    chunk to per-day sums straight away, so memory stays flat however large
+    the file is. legacy=True is the old whole-file read, kept for comparison.
+    Returns (daily series, rows read, seconds).
+    """
+    t0 = time.perf_counter(); rows = 0; daily = None
+    if legacy:
+        df = pd.read_csv(path); rows = len(df)
+        expense_df = df[df['Type'].astype(str).str.lower() == 'expense'].copy()
+        expense_df['Date'] = pd.to_datetime(expense_df['Date'], dayfirst=False, format='mixed', errors='coerce')
+        daily = expense_df.dropna(subset=['Date']).set_index('Date').resample('D')['Amount'].sum()
+    else:
+        for chunk in pd.read_csv(path, usecols=INGEST_COLUMNS, dtype={'Date': str, 'Type': str}, chunksize=chunksize):
+            rows += len(chunk)
+            part = daily_expenses(chunk)
+            daily = part if daily is None else daily.add(part, fill_value=0)
+    elapsed = time.perf_counter() - t0
+    if daily is None or daily.empty: return pd.Series(dtype=float), rows, elapsed
+    return daily.sort_index().resample('D').sum().fillna(0), rows, elapsed
+
+def compare_ingest(paths, chunksize=CHUNK_ROWS):
+    """Times the legacy and chunked readers on the same files (rows/s and peak traced memory)."""
+    for path in paths:
+        for name, legacy in [("legacy", True), ("chunked", False)]:
+            tracemalloc.start()
+            daily, rows, elapsed = load_daily_series(path, chunksize, legacy)
+            peak = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+            print(f"{path} [{name}]: {rows:,} rows in {elapsed:.2f}s = {rows / max(elapsed, 1e-9):,.0f} rows/s, "
+                  f"peak {peak / 2**20:.1f} MiB, {len(daily)} days, total {daily.sum():,.2f}")
+
+
+class WindowDataset:
+    """
+    Zero-copy training windows over one or more scaled daily series.
+    Series are laid end to end in one flat array; every (X, y) window is a
+    view from sliding_window_view, and only the rows of the current batch
+    are ever copied out.
+    """
+    def __init__(self, scaled_series, look_back=LOOK_BACK):
+        self.look_back = look_back
+        series = [s for s in scaled_series if len(s) > look_back]
+        self.flat = np.concatenate(series).astype(np.float32) if series else np.empty(0, dtype=np.float32)
+        self.windows = sliding_window_view(self.flat, look_back + 1) if series else np.empty((0, look_back + 1), dtype=np.float32)
+        # Valid window starts never cross from one series into the next
+        starts, offset = [], 0
+        for s in series:
+            starts.append(np.arange(offset, offset + len(s) - look_back)); offset += len(s)
+        self.starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+
+    def __len__(self): return len(self.starts)
+
+    def batches(self, batch_size=BATCH_SIZE, shuffle=True, seed=None):
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(self.starts) if shuffle else self.starts
+        for b in range(0, len(order), batch_size):
+            w = self.windows[order[b:b + batch_size]]
+            yield w[:, :self.look_back, None], w[:, self.look_back:]
+
+    def to_tf(self, batch_size=BATCH_SIZE, shuffle=True):
+        """tf.data pipeline that re-shuffles and streams batches every epoch."""
+        spec = (tf.TensorSpec((None, self.look_back, 1), tf.float32), tf.TensorSpec((None, 1), tf.float32))
+        return tf.data.Dataset.from_generator(lambda: self.batches(batch_size, shuffle), output_signature=spec).prefetch(tf.data.AUTOTUNE)
+
 
+def build_model():
     # 4. Build the LSTM Model (More Neurons as requested)
     print("🧠 Building Neural Network...")
     model = Sequential()
-    
+
     # Layer 1: Heavy Processing (128 Neurons)
     model.add(LSTM(128, return_sequences=True, input_shape=(LOOK_BACK, 1)))
     model.add(Dropout(0.2)) # Prevents 'memorizing' data
-    
+
     # Layer 2: Refinement (64 Neurons)
     model.add(LSTM(64, return_sequences=False))
     model.add(Dropout(0.2))
-    
+
     # Output Layer
-    model.add(Dense(1)) 
+    model.add(Dense(1))
 
     model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+def train_network(paths=None, chunksize=CHUNK_ROWS, epochs=EPOCHS, batch_size=BATCH_SIZE):
+    paths = paths or [KAGGLE_FILE]
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        print(f" Error: '{missing[0]}' not found. Please upload it.")
+        return
+
+    scaled_series = []
+    for path in paths:
+        print(f"Loading {path}...")
+        daily_data, rows, elapsed = load_daily_series(path, chunksize)
+        print(f"✅ Data Processed. {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s), {len(daily_data)} days of history.")
+        if daily_data.empty: continue
+
+        # Each file is scaled on its own, the same way the app scales each user
+        scaler = MinMaxScaler(feature_range=(0, 1))
+        scaled_series.append(scaler.fit_transform(daily_data.values.reshape(-1, 1)).ravel())
+
+    data = WindowDataset(scaled_series)
+    if not len(data):
+        print(f" Error: Need more than {LOOK_BACK} days of expenses to train.")
+        return
+
+    model = build_model()
+
+    print(f"Training Model on {len(data)} windows... (This may take a minute)")
+    model.fit(data.to_tf(batch_size), epochs=epochs)
 
-    
-    print("Training Model... (This may take a minute)")
-    model.fit(X, y, epochs=20, batch_size=32)
 
-    
     model.save(MODEL_FILE)
     print(f"Success! Model saved as '{MODEL_FILE}'. You can now run the App.")
+    export_weights(MODEL_FILE)
+
+def export_weights(model_path=MODEL_FILE, out_path=None):
+    """
+    Writes the model's weights to a .npz next to it, for forecast.py's
+    TensorFlow-free engine: per layer i, its kind (lstm_seq / lstm / dense)
+    plus i/kernel, i/recurrent_kernel and i/bias.
+    """
+    from forecast import weights_path
+    out_path = out_path or weights_path(model_path)
+    model = tf.keras.models.load_model(model_path, compile=False)
+    kinds, arrays = [], {}
+    for layer in model.layers:
+        if isinstance(layer, Dropout): continue
+        i = len(kinds)
+        if isinstance(layer, LSTM):
+            if layer.activation.__name__ != "tanh" or layer.recurrent_activation.__name__ != "sigmoid" or not layer.use_bias:
+                raise ValueError(f"{layer.name}: only tanh/sigmoid LSTMs with bias can be exported")
+            kinds.append("lstm_seq" if layer.return_sequences else "lstm")
+            arrays[f"{i}/kernel"], arrays[f"{i}/recurrent_kernel"], arrays[f"{i}/bias"] = layer.get_weights()
+        elif isinstance(layer, Dense):
+            if layer.activation.__name__ != "linear": raise ValueError(f"{layer.name}: only a linear Dense head can be exported")
+            kinds.append("dense"); arrays[f"{i}/kernel"], arrays[f"{i}/bias"] = layer.get_weights()
+        else: raise ValueError(f"{layer.name}: {type(layer).__name__} layers can't be exported")
+    np.savez(out_path, layers=np.array(kinds), look_back=LOOK_BACK, **{k: v.astype(np.float32) for k, v in arrays.items()})
+    print(f"Weights exported to '{out_path}' (runs without TensorFlow; check with: python forecast.py --model {model_path}).")
+    return out_path
 
 if __name__ == "__main__":
-    train_network()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the Master Brain LSTM.")
+    parser.add_argument("csv", nargs="*", help=f"Training CSVs (default: {KAGGLE_FILE})")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="Rows per CSV chunk")
+    parser.add_argument("--compare-ingest", action="store_true", help="Time the legacy vs chunked CSV reader and exit")
+    parser.add_argument("--export-weights", action="store_true", help=f"Export {MODEL_FILE} to .npz for TensorFlow-free inference and exit")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    if args.export_weights: export_weights()
+    elif args.compare_ingest: compare_ingest(args.csv or [KAGGLE_FILE], args.chunksize)
+    else: train_network(args.csv, args.chunksize, args.epochs, args.batch_size)